@@ -3,9 +3,42 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
 
-from .models import Restaurant, Dish, Profile 
+from .models import Restaurant, Dish, Profile, Order, OrderItem, Card
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Em tabelas grandes sem filtro, usa a estimativa de linhas do PostgreSQL
+    (pg_class.reltuples) em vez de um COUNT(*) que varre a tabela inteira.
+    """
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= self.estimate_threshold:
+                return row[0]
+        return super().count
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Evita o COUNT(*) extra sem filtros ao exibir "X de Y resultados".
+    show_full_result_count = False
+    list_per_page = 50
 
 
 class ProfileInline(admin.StackedInline):
@@ -15,12 +48,78 @@ class ProfileInline(admin.StackedInline):
 
 class UserAdmin(BaseUserAdmin):
     inlines = (ProfileInline,)
+    list_display = ('username', 'email', 'first_name', 'role', 'is_active', 'is_staff')
+    list_select_related = ('profile',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @admin.display(description='Role', ordering='profile__role')
+    def role(self, obj):
+        profile = getattr(obj, 'profile', None)
+        return profile.role if profile else None
 
 
 admin.site.unregister(User)
 admin.site.register(User, UserAdmin)
 
 
-admin.site.register(Restaurant)
-admin.site.register(Dish)
+@admin.register(Restaurant)
+class RestaurantAdmin(ScalableModelAdmin):
+    list_display = ('name', 'address', 'delivery_time', 'delivery_radius_km')
+    search_fields = ('name',)
+
+
+@admin.register(Dish)
+class DishAdmin(ScalableModelAdmin):
+    list_display = ('name', 'restaurant', 'category', 'price', 'stock')
+    list_select_related = ('restaurant',)
+    list_filter = ('category',)
+    search_fields = ('name',)
+    autocomplete_fields = ('restaurant',)
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    can_delete = False
+    fields = ('dish', 'dish_name', 'quantity', 'price')
+    readonly_fields = ('dish', 'dish_name', 'quantity', 'price')
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('dish__restaurant')
+
+
+@admin.register(Order)
+class OrderAdmin(ScalableModelAdmin):
+    list_display = ('id', 'user', 'restaurant', 'status', 'payment_method', 'total', 'created_at')
+    list_select_related = ('user', 'restaurant')
+    list_filter = ('status',)
+    search_fields = ('user__email',)
+    autocomplete_fields = ('user', 'restaurant')
+    # Pela chave primária (mesma ordem de criação): nenhum índice começa por
+    # created_at, e ordenar por ele exigiria um top-N sobre a tabela toda.
+    ordering = ('-pk',)
+    inlines = (OrderItemInline,)
+
+
+@admin.register(OrderItem)
+class OrderItemAdmin(ScalableModelAdmin):
+    list_display = ('id', 'order', 'dish_name', 'quantity', 'price')
+    list_select_related = ('order', 'dish__restaurant')
+    autocomplete_fields = ('order', 'dish')
+
+
+@admin.register(Card)
+class CardAdmin(ScalableModelAdmin):
+    list_display = ('id', 'user', 'card_brand', 'card_type', 'last_digits', 'created_at')
+    list_select_related = ('user',)
+    search_fields = ('user__email',)
+    autocomplete_fields = ('user',)
+    exclude = ('cvv',)
 
+    @admin.display(description='Final')
+    def last_digits(self, obj):
+        return f'**** {obj.card_number[-4:]}'
@@ -0,0 +1,127 @@
+# app/archive.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+ORDER_FIELDS = ['id', 'user_id', 'restaurant_id', 'status', 'created_at', 'total', 'payment_method']
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Move um lote de pedidos completos criados antes de `cutoff` (e seus itens)
+    para as tabelas de arquivo, numa única transação. Retorna quantos pedidos
+    foram movidos.
+    """
+    with transaction.atomic():
+        orders = list(
+            Order.objects.filter(status='C', created_at__lt=cutoff)
+            .order_by('pk').values(*ORDER_FIELDS)[:batch_size]
+        )
+        if not orders:
+            return 0
+        order_ids = [order['id'] for order in orders]
+        items = OrderItem.objects.filter(order_id__in=order_ids).values(
+            'id', 'order_id', 'dish_id', 'dish_name', 'quantity', 'price',
+        )
+
+        ArchivedOrder.objects.bulk_create([ArchivedOrder(**order) for order in orders])
+        ArchivedOrderItem.objects.bulk_create([
+            ArchivedOrderItem(
+                id=item['id'], order_id=item['order_id'], dish_id=item['dish_id'], dish_name=item['dish_name'],
+                quantity=item['quantity'], price=item['price'],
+            )
+            for item in items
+        ])
+
+        OrderItem.objects.filter(order_id__in=order_ids).delete()
+        Order.objects.filter(pk__in=order_ids).delete()
+    return len(orders)
+
+
+def archive_orders(older_than_days=None, batch_size=None, max_batches=None):
+    """
+    Arquiva em lotes os pedidos completos mais antigos que `older_than_days`.
+    Cada lote é uma transação curta, para não segurar locks nas tabelas quentes.
+    """
+    if older_than_days is None:
+        older_than_days = getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 180)
+    if batch_size is None:
+        batch_size = getattr(settings, 'ORDER_ARCHIVE_BATCH_SIZE', 1000)
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+
+    archived = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            break
+        archived += moved
+        batches += 1
+    return archived
+
+
+def table_sizes():
+    """
+    Linhas e tamanho em disco das tabelas de pedidos (quentes e de arquivo).
+    O tamanho só é conhecido no PostgreSQL; nos demais bancos fica como None.
+    """
+    sizes = []
+    for model in (Order, OrderItem, ArchivedOrder, ArchivedOrderItem):
+        table = model._meta.db_table
+        size = None
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_total_relation_size(%s::regclass)', [table])
+                size = cursor.fetchone()[0]
+        sizes.append({'table': table, 'rows': model.objects.count(), 'bytes': size})
+    return sizes
+
+
+class OrderHistory:
+    """
+    Histórico de pedidos de um usuário: primeiro os pedidos quentes, depois os
+    arquivados. Fatias só consultam o arquivo quando passam da janela quente
+    (a paginação do histórico não usa count(), que contaria o arquivo).
+    """
+
+    def __init__(self, hot, archived):
+        self.hot = hot
+        self.archived = archived
+        self._hot_count = None
+
+    @property
+    def hot_count(self):
+        if self._hot_count is None:
+            self._hot_count = self.hot.count()
+        return self._hot_count
+
+    def count(self):
+        return self.hot_count + self.archived.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        yield from self.hot
+        yield from self.archived
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError('OrderHistory só aceita fatias contíguas.')
+        start = key.start or 0
+        stop = key.stop
+        hot_count = self.hot_count
+
+        results = []
+        if start < hot_count:
+            results.extend(self.hot[start:stop])
+        if stop is None or stop > hot_count:
+            archived_start = max(start - hot_count, 0)
+            archived_stop = None if stop is None else stop - hot_count
+            results.extend(self.archived[archived_start:archived_stop])
+        return results
@@ -0,0 +1,133 @@
+# app/batch.py
+
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework.authentication import BaseAuthentication
+
+logger = logging.getLogger(__name__)
+
+BATCH_PATH = '/api/batch/'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class InvalidSubRequest(Exception):
+    pass
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'BATCH_MAX_WORKERS', 4), thread_name_prefix='batch',
+                )
+    return _executor
+
+
+def parse_sub_request(spec):
+    """
+    Valida uma sub-requisição ({"method": "GET", "path": "/api/..."}) e
+    retorna (path, query_string).
+    """
+    if not isinstance(spec, dict) or not isinstance(spec.get('path'), str):
+        raise InvalidSubRequest('Cada requisição precisa de um "path".')
+    if str(spec.get('method', 'GET')).upper() != 'GET':
+        raise InvalidSubRequest('Apenas requisições GET são permitidas no batch.')
+
+    url = urlsplit(spec['path'])
+    if url.scheme or url.netloc or not url.path.startswith('/api/') or url.path == BATCH_PATH:
+        raise InvalidSubRequest(f'Caminho não permitido: {spec["path"]}')
+    return url.path, url.query
+
+
+class BatchSubRequestAuthentication(BaseAuthentication):
+    """
+    Autentica as sub-requisições do /api/batch/ com o usuário e o token já
+    validados no batch, para que o JWT não seja validado de novo em cada uma.
+    Só age nas requisições criadas por build_sub_request (atributo
+    `batch_auth`, que não vem do cliente); nas demais, passa adiante para o
+    JWTAuthentication.
+    """
+
+    def authenticate(self, request):
+        return getattr(request, 'batch_auth', None)
+
+
+def build_sub_request(request, path, query_string):
+    """
+    Cria a HttpRequest da sub-requisição, marcada com a autenticação do batch
+    (ver BatchSubRequestAuthentication).
+    """
+    sub_request = HttpRequest()
+    sub_request.method = 'GET'
+    sub_request.path = sub_request.path_info = path
+    sub_request.META = {
+        key: value for key, value in request.META.items()
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_AUTHORIZATION')
+    }
+    sub_request.META.update(REQUEST_METHOD='GET', PATH_INFO=path, QUERY_STRING=query_string)
+    sub_request.GET = QueryDict(query_string)
+    sub_request.user = request.user
+    sub_request.batch_auth = (request.user, request.auth)
+    return sub_request
+
+
+def response_body(response):
+    data = getattr(response, 'data', None)
+    if data is not None:
+        return data
+    if response.get('Content-Type', '').startswith('application/json'):
+        return json.loads(response.content or b'null')
+    return response.content.decode(response.charset or 'utf-8')
+
+
+def execute_sub_request(request, spec, in_worker_thread):
+    if in_worker_thread:
+        close_old_connections()
+    try:
+        path, query_string = parse_sub_request(spec)
+        try:
+            match = resolve(path)
+        except Resolver404:
+            return {'status': 404, 'body': {'error': 'Recurso não encontrado.'}}
+
+        if iscoroutinefunction(match.func):
+            raise InvalidSubRequest(f'Caminho não permitido: {path}')
+
+        sub_request = build_sub_request(request, path, query_string)
+        sub_request.resolver_match = match
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        if response.streaming:
+            return {'status': 400, 'body': {'error': 'Respostas em stream não são suportadas no batch.'}}
+        return {'status': response.status_code, 'body': response_body(response)}
+    except InvalidSubRequest as exc:
+        return {'status': 400, 'body': {'error': str(exc)}}
+    except Exception:
+        logger.exception('Erro ao executar sub-requisição do batch: %s', spec)
+        return {'status': 500, 'body': {'error': 'Erro interno.'}}
+    finally:
+        if in_worker_thread:
+            close_old_connections()
+
+
+def execute_batch(request, specs):
+    """
+    Executa as sub-requisições em paralelo (até settings.BATCH_MAX_WORKERS)
+    e retorna os resultados na mesma ordem em que foram pedidas.
+    """
+    if len(specs) <= 1 or getattr(settings, 'BATCH_MAX_WORKERS', 4) <= 1:
+        return [execute_sub_request(request, spec, False) for spec in specs]
+    futures = [get_executor().submit(execute_sub_request, request, spec, True) for spec in specs]
+    return [future.result() for future in futures]
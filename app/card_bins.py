@@ -0,0 +1,120 @@
+# app/card_bins.py
+
+import csv
+import heapq
+import threading
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+from django.conf import settings
+
+BinMatch = namedtuple('BinMatch', ['brand', 'card_type'])
+
+KEY_LENGTH = 8 # Dígitos do número do cartão usados como chave de busca
+
+
+def _range_keys(start, end):
+    """
+    Converte um intervalo de prefixos (ex: '51'-'55') em chaves de 8 dígitos.
+    """
+    return int(start.ljust(KEY_LENGTH, '0')), int(end.ljust(KEY_LENGTH, '9'))
+
+
+class BinTable:
+    """
+    Tabela de faixas de BIN compactada em arrays ordenados e sem sobreposição.
+
+    Faixas sobrepostas são resolvidas na carga pela mais específica (a mais
+    estreita), de modo que cada consulta é uma única busca binária.
+    """
+
+    def __init__(self, ranges):
+        """
+        `ranges`: iterável de (prefixo_inicial, prefixo_final, bandeira, tipo).
+        """
+        labels = []
+        label_ids = {}
+        entries = []
+        for start, end, brand, card_type in ranges:
+            label = BinMatch(brand, card_type or None)
+            if label not in label_ids:
+                label_ids[label] = len(labels)
+                labels.append(label)
+            low, high = _range_keys(start, end)
+            entries.append((low, high, label_ids[label]))
+        entries.sort()
+
+        self.starts = array('Q')
+        self.ends = array('Q')
+        self.label_ids = array('I')
+        self.labels = tuple(labels)
+
+        # Varre os pontos de fronteira mantendo um heap das faixas ativas,
+        # ordenado pela largura: o topo é sempre a faixa mais específica.
+        points = sorted({low for low, _, _ in entries} | {high + 1 for _, high, _ in entries})
+        active = []
+        index = 0
+        for point, next_point in zip(points, points[1:]):
+            while index < len(entries) and entries[index][0] <= point:
+                low, high, label_id = entries[index]
+                heapq.heappush(active, (high - low, index, high, label_id))
+                index += 1
+            while active and active[0][2] < point:
+                heapq.heappop(active)
+            if active:
+                self._append(point, next_point - 1, active[0][3])
+
+    def _append(self, low, high, label_id):
+        # Junta intervalos contíguos com o mesmo rótulo.
+        if self.ends and self.ends[-1] == low - 1 and self.label_ids[-1] == label_id:
+            self.ends[-1] = high
+            return
+        self.starts.append(low)
+        self.ends.append(high)
+        self.label_ids.append(label_id)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, newline='', encoding='utf-8') as csv_file:
+            rows = csv.DictReader(csv_file)
+            return cls(
+                (row['start'].strip(), row['end'].strip(), row['brand'].strip(), row.get('card_type', '').strip())
+                for row in rows
+            )
+
+    def lookup(self, card_number):
+        """
+        Retorna o BinMatch do número do cartão, ou None se nenhuma faixa o cobrir.
+        """
+        digits = card_number[:KEY_LENGTH]
+        if not digits.isdigit():
+            return None
+        key = int(digits.ljust(KEY_LENGTH, '0'))
+        position = bisect_right(self.starts, key) - 1
+        if position >= 0 and key <= self.ends[position]:
+            return self.labels[self.label_ids[position]]
+        return None
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_bin_table():
+    """
+    Carrega (uma vez por processo) a tabela definida em settings.CARD_BIN_TABLE.
+    """
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = BinTable.from_csv(settings.CARD_BIN_TABLE)
+    return _table
+
+
+def detect_card_brand(card_number):
+    return get_bin_table().lookup(card_number)
@@ -0,0 +1,156 @@
+# app/eta.py
+
+import math
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+KEY_PREFIX = 'restaurant-load'
+
+RestaurantLoad = namedtuple('RestaurantLoad', ['completed', 'pending', 'window_minutes'])
+
+
+def _bucket_seconds():
+    return getattr(settings, 'RESTAURANT_LOAD_BUCKET_SECONDS', 300)
+
+
+def _window_buckets():
+    return getattr(settings, 'RESTAURANT_LOAD_WINDOW_BUCKETS', 6)
+
+
+def _current_bucket():
+    return int(time.time() // _bucket_seconds())
+
+
+def _bucket_key(restaurant_id, kind, bucket):
+    return f'{KEY_PREFIX}:{restaurant_id}:{kind}:{bucket}'
+
+
+def _pending_key(restaurant_id):
+    return f'{KEY_PREFIX}:{restaurant_id}:pending'
+
+
+def _incr(key, delta, timeout):
+    # add() é no-op se a chave já existe; incr() é atômico no Redis e no
+    # LocMemCache.
+    cache.add(key, 0, timeout)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # A chave expirou entre o add() e o incr().
+        cache.add(key, delta, timeout)
+
+
+# ===================================================================
+# CONTADORES (ATUALIZADOS PELOS SIGNALS DE Order)
+# ===================================================================
+
+def _count(restaurant_id, kind):
+    # Um contador por intervalo de RESTAURANT_LOAD_BUCKET_SECONDS; expira
+    # sozinho quando sai da janela.
+    timeout = _bucket_seconds() * (_window_buckets() + 1)
+    _incr(_bucket_key(restaurant_id, kind, _current_bucket()), 1, timeout)
+
+
+def _count_pending(restaurant_ids):
+    # Conta pelo índice order_restaurant_queue_idx.
+    from .models import Order
+
+    counts = dict.fromkeys(restaurant_ids, 0)
+    counts.update(
+        Order.objects.filter(restaurant_id__in=restaurant_ids, status='P')
+        .values_list('restaurant_id')
+        .annotate(pending=Count('id'))
+        .order_by()
+    )
+    return counts
+
+
+def reseed_pending(restaurant_ids):
+    """
+    Regrava a fila de pendentes dos restaurantes a partir do banco, corrigindo
+    divergências dos contadores (ex.: updates em massa sem signals) e
+    preenchendo o cache depois de um restart. Usado pelo comando
+    refresh_restaurant_loads; a leitura (get_loads) nunca consulta o banco.
+    """
+    counts = _count_pending(restaurant_ids)
+    cache.set_many({_pending_key(restaurant_id): pending for restaurant_id, pending in counts.items()}, None)
+    return counts
+
+
+def _adjust_pending(restaurant_id, delta):
+    # Chamado depois do commit: se a chave não existe, o banco já reflete a
+    # mudança e basta semeá-la.
+    try:
+        cache.incr(_pending_key(restaurant_id), delta)
+    except ValueError:
+        cache.add(_pending_key(restaurant_id), _count_pending([restaurant_id])[restaurant_id], None)
+
+
+def record_order_created(restaurant_id, pending):
+    if pending:
+        _adjust_pending(restaurant_id, 1)
+
+
+def record_order_completed(restaurant_id):
+    _count(restaurant_id, 'completed')
+    _adjust_pending(restaurant_id, -1)
+
+
+def record_pending_removed(restaurant_id):
+    _adjust_pending(restaurant_id, -1)
+
+
+# ===================================================================
+# LEITURA E MODELO DE ETA
+# ===================================================================
+
+def get_loads(restaurant_ids):
+    """
+    Carga de cada restaurante na janela deslizante ({id: RestaurantLoad}),
+    com um único get_many no cache, sem consultas ao banco. Sem a chave da
+    fila (cache frio), o restaurante fica com a ETA cadastrada até o próximo
+    pedido ou o próximo refresh_restaurant_loads.
+    """
+    current = _current_bucket()
+    buckets = range(current - _window_buckets() + 1, current + 1)
+    keys = {}
+    for restaurant_id in restaurant_ids:
+        keys[restaurant_id] = (
+            [_bucket_key(restaurant_id, 'completed', bucket) for bucket in buckets],
+            _pending_key(restaurant_id),
+        )
+    values = cache.get_many([
+        key for completed, pending in keys.values() for key in (*completed, pending)
+    ])
+
+    window_minutes = _window_buckets() * _bucket_seconds() / 60
+    loads = {}
+    for restaurant_id, (completed, pending) in keys.items():
+        loads[restaurant_id] = RestaurantLoad(
+            completed=sum(values.get(key, 0) for key in completed),
+            # Os contadores podem divergir (ex.: updates em massa sem signals).
+            pending=max(values.get(pending, 0), 0),
+            window_minutes=window_minutes,
+        )
+    return loads
+
+
+def estimate_preparation_minutes(base_minutes, load):
+    """
+    Tempo estimado (em minutos) até o pedido sair do restaurante: o
+    `delivery_time` cadastrado mais a espera pela fila de pendentes, que é
+    escoada no ritmo de conclusões da janela (com um piso em
+    settings.RESTAURANT_MIN_THROUGHPUT_PER_HOUR). Limitado a
+    settings.RESTAURANT_ETA_MAX_FACTOR vezes o valor cadastrado.
+    """
+    if load is None or not load.pending:
+        return base_minutes
+    min_per_minute = getattr(settings, 'RESTAURANT_MIN_THROUGHPUT_PER_HOUR', 12) / 60
+    throughput = max(load.completed / load.window_minutes, min_per_minute)
+    queue_minutes = load.pending / throughput
+    max_minutes = base_minutes * getattr(settings, 'RESTAURANT_ETA_MAX_FACTOR', 3)
+    return min(base_minutes + math.ceil(queue_minutes), max_minutes)
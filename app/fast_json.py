@@ -0,0 +1,192 @@
+# app/fast_json.py
+#
+# Caminho rápido de leitura para as listagens mais pesadas. Monta o mesmo JSON
+# dos serializers (RestaurantSerializer, OrderSerializer,
+# ArchivedOrderSerializer e UserAndProfileSerializer) direto de linhas
+# .values(), sem instanciar campos do DRF. A saída precisa continuar
+# byte a byte igual à dos serializers (ver app/tests.py): ao mudar os campos de
+# um deles, mude aqui também.
+
+import json
+from collections import defaultdict
+from decimal import Decimal
+
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.settings import api_settings
+
+from .eta import estimate_preparation_minutes, get_loads
+from .models import Dish
+
+CENTS = Decimal('0.01')
+
+
+# ===================================================================
+# CONVERSÕES (MESMAS REGRAS DOS CAMPOS DO DRF)
+# ===================================================================
+
+def _decimal(value):
+    # DecimalField(decimal_places=2) com COERCE_DECIMAL_TO_STRING.
+    if value is None:
+        return None
+    return '{:f}'.format(value.quantize(CENTS))
+
+
+def _datetime(value):
+    # DateTimeField em ISO 8601, no fuso horário corrente.
+    if value is None:
+        return None
+    value = value.astimezone(timezone.get_current_timezone()).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def render(data):
+    """
+    Mesmo resultado do JSONRenderer do DRF (com as configurações padrão de
+    UNICODE_JSON, COMPACT_JSON e STRICT_JSON), usando o encoder em C do json,
+    já que os dados aqui são apenas tipos primitivos.
+    """
+    content = json.dumps(
+        data,
+        ensure_ascii=not api_settings.UNICODE_JSON,
+        allow_nan=not api_settings.STRICT_JSON,
+        separators=(',', ':') if api_settings.COMPACT_JSON else None,
+    )
+    return content.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+
+def json_response(data):
+    return HttpResponse(render(data), content_type='application/json')
+
+
+# ===================================================================
+# RESTAURANTES
+# ===================================================================
+
+RESTAURANT_FIELDS = (
+    'id', 'name', 'description', 'address', 'delivery_time', 'image',
+    'latitude', 'longitude', 'delivery_radius_km',
+)
+DISH_FIELDS = ('id', 'name', 'description', 'price', 'restaurant_id', 'category', 'image', 'stock')
+
+
+def dish_rows(queryset):
+    return [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'description': row['description'],
+            'price': _decimal(row['price']),
+            'restaurant': row['restaurant_id'],
+            'category': row['category'],
+            'image': row['image'],
+            'stock': row['stock'],
+        }
+        for row in queryset.values(*DISH_FIELDS)
+    ]
+
+
+def restaurant_list(queryset):
+    """
+    Lista de RestaurantSerializer: uma consulta para os restaurantes e outra
+    para todos os pratos, agrupados numa única passada. A ETA vem do cache.
+    """
+    rows = list(queryset.prefetch_related(None).values(*RESTAURANT_FIELDS))
+    restaurant_ids = [row['id'] for row in rows]
+    loads = get_loads(restaurant_ids)
+    dishes = defaultdict(list)
+    for dish in dish_rows(Dish.objects.filter(restaurant_id__in=restaurant_ids).order_by('id')):
+        dishes[dish['restaurant']].append(dish)
+    return [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'description': row['description'],
+            'address': row['address'],
+            'delivery_time': row['delivery_time'],
+            'estimated_delivery_time': estimate_preparation_minutes(row['delivery_time'], loads[row['id']]),
+            'image': row['image'],
+            'latitude': row['latitude'],
+            'longitude': row['longitude'],
+            'delivery_radius_km': row['delivery_radius_km'],
+            'dishes': dishes[row['id']],
+        }
+        for row in rows
+    ]
+
+
+# ===================================================================
+# PEDIDOS
+# ===================================================================
+
+ORDER_FIELDS = ('id', 'user_id', 'restaurant_id', 'status', 'created_at', 'total')
+
+
+def order_list(queryset, item_model):
+    """
+    Lista de OrderSerializer (ou ArchivedOrderSerializer, com
+    `item_model=ArchivedOrderItem`): uma consulta para os pedidos e outra para
+    os itens com o preço atual do prato.
+    """
+    orders = list(queryset.prefetch_related(None).values(*ORDER_FIELDS))
+    items = defaultdict(list)
+    item_rows = (
+        item_model.objects.filter(order_id__in=[order['id'] for order in orders])
+        .order_by('id')
+        .values_list('id', 'order_id', 'dish_id', 'quantity', 'price', 'dish_name', 'dish__price')
+    )
+    for item_id, order_id, dish_id, quantity, price, dish_name, dish_price in item_rows:
+        items[order_id].append({
+            'id': item_id,
+            'dish': dish_id,
+            'quantity': quantity,
+            'price': _decimal(price),
+            'dish_name': dish_name,
+            'dish_price': _decimal(dish_price),
+        })
+    return [
+        {
+            'id': order['id'],
+            'user': order['user_id'],
+            'restaurant': order['restaurant_id'],
+            'status': order['status'],
+            'created_at': _datetime(order['created_at']),
+            'total': _decimal(order['total']),
+            'order_items': items[order['id']],
+        }
+        for order in orders
+    ]
+
+
+# ===================================================================
+# USUÁRIOS
+# ===================================================================
+
+USER_FIELDS = (
+    'id', 'username', 'email', 'is_active', 'date_joined', 'first_name',
+    'profile__id', 'profile__role', 'profile__phone_number', 'profile__address',
+)
+
+
+def user_list(queryset):
+    """
+    Lista de UserAndProfileSerializer numa única consulta (LEFT JOIN no perfil).
+    """
+    return [
+        {
+            'id': row['id'],
+            'username': row['username'],
+            'email': row['email'],
+            'is_active': row['is_active'],
+            'date_joined': _datetime(row['date_joined']),
+            'first_name': row['first_name'],
+            'profile': None if row['profile__id'] is None else {
+                'role': row['profile__role'],
+                'phone_number': row['profile__phone_number'],
+                'address': row['profile__address'],
+            },
+        }
+        for row in queryset.select_related(None).values(*USER_FIELDS)
+    ]
@@ -0,0 +1,177 @@
+# app/geo.py
+
+import math
+import re
+import threading
+import unicodedata
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .eta import estimate_preparation_minutes, get_loads
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+GEOHASH_PRECISION = 9 # ~5m x 5m, precisão usada para armazenar
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+# ===================================================================
+# GEOHASH E DISTÂNCIAS
+# ===================================================================
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, interval = (longitude, lng_range) if even else (latitude, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size_degrees(precision):
+    """
+    Retorna (altura, largura) em graus de uma célula de geohash.
+    """
+    total_bits = 5 * precision
+    lat_bits = total_bits // 2
+    lng_bits = total_bits - lat_bits
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def search_precision(latitude, radius_km):
+    """
+    Maior precisão cujas células ainda têm lado >= raio de busca, de forma
+    que a célula do ponto e suas 8 vizinhas cubram todo o círculo.
+    """
+    lng_scale = max(math.cos(math.radians(latitude)), 0.01)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size_degrees(precision)
+        if min(height * KM_PER_DEGREE, width * KM_PER_DEGREE * lng_scale) >= radius_km:
+            return precision
+    return 1
+
+
+def neighbor_prefixes(latitude, longitude, precision):
+    """
+    Geohash da célula do ponto e das 8 células ao redor.
+    """
+    height, width = cell_size_degrees(precision)
+    prefixes = set()
+    for d_lat in (-1, 0, 1):
+        for d_lng in (-1, 0, 1):
+            lat = min(max(latitude + d_lat * height, -90.0), 90.0)
+            lng = (longitude + d_lng * width + 180.0) % 360.0 - 180.0
+            prefixes.add(encode_geohash(lat, lng, precision))
+    return prefixes
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def estimate_delivery_minutes(base_minutes, distance_km):
+    speed = getattr(settings, 'DELIVERY_AVERAGE_SPEED_KMH', 20)
+    return base_minutes + math.ceil(distance_km / speed * 60)
+
+
+def nearby_restaurants(queryset, latitude, longitude):
+    """
+    Restaurantes que entregam no ponto informado, ordenados por distância.
+
+    O índice de geohash reduz a busca às 9 células ao redor do ponto; o raio
+    de entrega de cada restaurante é conferido em Python sobre esse subconjunto.
+    Cada restaurante retornado ganha os atributos `distance_km` e
+    `estimated_delivery_time` (preparo pela carga atual, ver app/eta.py, mais
+    o deslocamento).
+    """
+    max_radius = getattr(settings, 'GEO_MAX_DELIVERY_RADIUS_KM', 15)
+    precision = search_precision(latitude, max_radius)
+    prefixes = neighbor_prefixes(latitude, longitude, precision)
+    candidates = queryset.filter(reduce(or_, (Q(geohash__startswith=prefix) for prefix in prefixes)))
+
+    results = []
+    for restaurant in candidates:
+        distance = haversine_km(latitude, longitude, restaurant.latitude, restaurant.longitude)
+        if distance > min(restaurant.delivery_radius_km, max_radius):
+            continue
+        restaurant.distance_km = round(distance, 2)
+        results.append((restaurant, distance))
+
+    # Tempo de preparo pela carga atual de cada restaurante (um get_many no cache).
+    loads = get_loads([restaurant.id for restaurant, _ in results])
+    for restaurant, distance in results:
+        preparation = estimate_preparation_minutes(restaurant.delivery_time, loads[restaurant.id])
+        restaurant.estimated_delivery_time = estimate_delivery_minutes(preparation, distance)
+    results = [restaurant for restaurant, _ in results]
+    results.sort(key=lambda restaurant: restaurant.distance_km)
+    return results
+
+
+# ===================================================================
+# GEOCODIFICAÇÃO
+# ===================================================================
+
+def normalize_address(address):
+    address = unicodedata.normalize('NFKD', address)
+    address = ''.join(char for char in address if not unicodedata.combining(char))
+    return re.sub(r'\s+', ' ', address).strip().lower()
+
+
+class LocalGeocoder:
+    """
+    Geocodificador local, sem serviço externo. Resolve endereços a partir da
+    tabela settings.GEOCODER_LOCAL_TABLE ({endereço: (latitude, longitude)}).
+    """
+
+    def __init__(self, table=None):
+        if table is None:
+            table = getattr(settings, 'GEOCODER_LOCAL_TABLE', {})
+        self.table = {normalize_address(address): tuple(coords) for address, coords in table.items()}
+
+    def geocode(self, address):
+        """
+        Retorna (latitude, longitude) ou None se o endereço for desconhecido.
+        """
+        if not address:
+            return None
+        return self.table.get(normalize_address(address))
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder():
+    """
+    Retorna a instância do geocodificador configurado em settings.GEOCODER_BACKEND.
+    """
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                _geocoder = import_string(getattr(settings, 'GEOCODER_BACKEND', 'app.geo.LocalGeocoder'))()
+    return _geocoder
@@ -0,0 +1,235 @@
+# app/hashing.py
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from django.contrib.auth.signals import user_login_failed
+
+
+class HashPoolSaturated(Exception):
+    """
+    O pool de hashing está cheio (ou demorou demais): a requisição deve ser
+    recusada rapidamente com 503 em vez de esperar.
+    """
+
+
+# ===================================================================
+# FUNÇÕES EXECUTADAS NOS PROCESSOS DO POOL
+# ===================================================================
+
+def _init_worker():
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    django.setup()
+
+
+def _verify(password, encoded):
+    """
+    Retorna (senha_válida, novo_hash). O novo hash só é gerado quando o
+    algoritmo ou as iterações do hash salvo estão desatualizados.
+    """
+    if not check_password(password, encoded):
+        return False, None
+    if identify_hasher(encoded).must_update(encoded):
+        return True, make_password(password)
+    return True, None
+
+
+def _make_password(password):
+    return make_password(password)
+
+
+# ===================================================================
+# POOL
+# ===================================================================
+
+class HashPool:
+    """
+    Pool de processos limitado para o hashing de senhas (PBKDF2), fora dos
+    workers que atendem o resto da API.
+
+    Aceita até `workers + queue_limit` tarefas ao mesmo tempo; acima disso
+    levanta HashPoolSaturated imediatamente (backpressure). Os limites valem
+    por processo do servidor: cada worker do gunicorn tem o seu pool.
+
+    Se um processo do pool morrer (OOM, kill), o ProcessPoolExecutor fica
+    quebrado para sempre: o pool é descartado, a requisição recebe
+    HashPoolSaturated (503) e a próxima cria um pool novo.
+    """
+
+    def __init__(self, workers, queue_limit, timeout):
+        self.workers = workers
+        self.capacity = workers + queue_limit
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._busy_seconds = 0.0
+        self._started_at = time.monotonic()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+        return self._executor
+
+    def submit(self, fn, *args):
+        """
+        Agenda `fn` no pool e retorna um concurrent.futures.Future, que também
+        pode ser aguardado num event loop com asyncio.wrap_future.
+        """
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise HashPoolSaturated()
+            self._in_flight += 1
+            executor = self._get_executor()
+
+        submitted_at = time.monotonic()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._release(0.0)
+            self._discard(executor)
+            raise HashPoolSaturated()
+        except Exception:
+            self._release(0.0)
+            raise
+        future.executor = executor
+        future.add_done_callback(lambda _: self._release(time.monotonic() - submitted_at))
+        return future
+
+    def _discard(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, elapsed):
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+            self._busy_seconds += elapsed
+
+    async def arun(self, fn, *args):
+        """
+        Executa `fn` no pool e aguarda o resultado no event loop: a thread do
+        servidor fica livre enquanto o hash é calculado. Levanta
+        HashPoolSaturated se o pool estiver cheio, quebrado ou passar do
+        timeout.
+        """
+        future = self.submit(fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise HashPoolSaturated()
+        except BrokenProcessPool:
+            self._discard(future.executor)
+            raise HashPoolSaturated()
+
+    def stats(self):
+        with self._lock:
+            in_flight = self._in_flight
+            completed = self._completed
+            rejected = self._rejected
+            busy_seconds = self._busy_seconds
+        running = min(in_flight, self.workers)
+        return {
+            'workers': self.workers,
+            'capacity': self.capacity,
+            'in_flight': in_flight,
+            'running': running,
+            'queued': in_flight - running,
+            'utilization': running / self.workers,
+            'completed': completed,
+            'rejected': rejected,
+            'avg_seconds': busy_seconds / completed if completed else 0.0,
+            'uptime_seconds': time.monotonic() - self._started_at,
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hash_pool():
+    """
+    Pool do processo atual, criado na primeira utilização (depois do fork dos
+    workers do servidor). Retorna None se settings.PASSWORD_HASH_WORKERS for 0.
+    """
+    global _pool
+    workers = getattr(settings, 'PASSWORD_HASH_WORKERS', 0)
+    if workers <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashPool(
+                    workers=workers,
+                    queue_limit=getattr(settings, 'PASSWORD_HASH_QUEUE_LIMIT', 32),
+                    timeout=getattr(settings, 'PASSWORD_HASH_TIMEOUT', 10),
+                )
+    return _pool
+
+
+# ===================================================================
+# API USADA PELAS VIEWS
+# ===================================================================
+
+async def ahash_password(password):
+    pool = get_hash_pool()
+    if pool is None:
+        return await sync_to_async(make_password)(password)
+    return await pool.arun(_make_password, password)
+
+
+async def aauthenticate_user(request, username, password):
+    """
+    Equivalente assíncrono do authenticate() para o login: as consultas rodam
+    em sync_to_async e o hash é verificado no pool, aguardado no event loop.
+    Pode levantar HashPoolSaturated.
+
+    Com o pool ativo, só reproduz o ModelBackend (AUTHENTICATION_BACKENDS não
+    é consultado), mas envia user_login_failed como o authenticate(). Sem o
+    pool, usa o próprio authenticate().
+    """
+    pool = get_hash_pool()
+    if pool is None:
+        return await sync_to_async(authenticate)(request, username=username, password=password)
+    if username is None or password is None:
+        return None
+
+    UserModel = get_user_model()
+    user = await UserModel._default_manager.filter(**{UserModel.USERNAME_FIELD: username}).afirst()
+    if user is None:
+        # Como o ModelBackend, gasta um hash mesmo sem usuário, para não
+        # revelar pelo tempo de resposta quais e-mails estão cadastrados.
+        await pool.arun(_make_password, password)
+        valid = False
+    else:
+        valid, new_encoded = await pool.arun(_verify, password, user.password)
+
+    if not valid or not user.is_active:
+        await user_login_failed.asend(
+            sender=__name__, credentials={'username': username, 'password': '********************'}, request=request,
+        )
+        return None
+    if new_encoded:
+        user.password = new_encoded
+        await user.asave(update_fields=['password'])
+    user.backend = 'django.contrib.auth.backends.ModelBackend'
+    return user
@@ -0,0 +1,76 @@
+# app/inventory.py
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Q
+
+from .models import Dish, Order, OrderItem
+
+
+class OutOfStock(Exception):
+    def __init__(self, dish_ids, dish_names=None):
+        if dish_names:
+            message = f'Estoque insuficiente para: {", ".join(dish_names)}.'
+        else:
+            message = f'Estoque insuficiente para os pratos {dish_ids}.'
+        super().__init__(message)
+        self.dish_ids = dish_ids
+        self.dish_names = dish_names
+
+
+def reserve_stock(quantities):
+    """
+    Baixa o estoque dos pratos de uma cesta ({dish_id: quantidade}).
+
+    Cada prato é decrementado com um único UPDATE condicional
+    (`WHERE stock IS NULL OR stock >= qtd`), sem SELECT ... FOR UPDATE, então
+    pedidos concorrentes nunca deixam o estoque negativo. Deve ser chamado
+    dentro de transaction.atomic(): se algum prato não tiver estoque, levanta
+    OutOfStock e a transação desfaz os decrementos já feitos.
+
+    Os pratos são atualizados em ordem de id para evitar deadlocks entre
+    cestas concorrentes.
+    """
+    out_of_stock = []
+    for dish_id in sorted(quantities):
+        quantity = quantities[dish_id]
+        updated = (
+            Dish.objects
+            .filter(Q(stock__isnull=True) | Q(stock__gte=quantity), pk=dish_id)
+            .update(stock=F('stock') - quantity)
+        )
+        if not updated:
+            out_of_stock.append(dish_id)
+    if out_of_stock:
+        raise OutOfStock(out_of_stock)
+
+
+def place_order(items, tracked_dish_ids, **order_fields):
+    """
+    Grava um pedido com os itens informados (OrderItem ainda não salvos, com
+    dish_name e price preenchidos) e baixa o estoque dos pratos em
+    `tracked_dish_ids`, tudo numa transação. Usado pelo checkout e pelo
+    reorder.
+
+    Se faltar estoque, nada é gravado e levanta OutOfStock com os nomes dos
+    pratos, para os dois caminhos responderem com o mesmo erro.
+    """
+    tracked_quantities = defaultdict(int)
+    for item in items:
+        # Pratos sem controle de estoque (stock nulo) não geram UPDATE.
+        if item.dish_id in tracked_dish_ids:
+            tracked_quantities[item.dish_id] += item.quantity
+
+    try:
+        with transaction.atomic():
+            order = Order.objects.create(total=sum(item.price * item.quantity for item in items), **order_fields)
+            for item in items:
+                item.order = order
+            OrderItem.objects.bulk_create(items)
+            # Por último, para segurar os locks de linha só até o commit.
+            reserve_stock(tracked_quantities)
+    except OutOfStock as exc:
+        names = {item.dish_id: item.dish_name for item in items}
+        raise OutOfStock(exc.dish_ids, [names[dish_id] for dish_id in exc.dish_ids]) from exc
+    return order
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from app.archive import archive_orders, table_sizes
+
+
+class Command(BaseCommand):
+    help = (
+        'Move pedidos completos antigos (e seus itens) para as tabelas de arquivo, '
+        'em lotes, e mostra o tamanho das tabelas antes e depois.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--max-batches', type=int, default=None)
+        parser.add_argument('--dry-run', action='store_true', help='Só mostra o tamanho das tabelas.')
+
+    def handle(self, *args, **options):
+        self.report('Antes', table_sizes())
+        if options['dry_run']:
+            return
+
+        archived = archive_orders(
+            older_than_days=options['older_than_days'],
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'{archived} pedidos arquivados.'))
+        self.report('Depois', table_sizes())
+
+    def report(self, title, sizes):
+        self.stdout.write(f'{title}:')
+        for entry in sizes:
+            size = '' if entry['bytes'] is None else f", {entry['bytes'] / 1024 / 1024:.1f} MB"
+            self.stdout.write(f"  {entry['table']}: {entry['rows']} linhas{size}")
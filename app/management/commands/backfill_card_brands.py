@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from app.card_bins import detect_card_brand
+from app.models import Card
+
+
+class Command(BaseCommand):
+    help = 'Preenche bandeira e tipo dos cartões já cadastrados a partir da tabela de BIN.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Recalcula também os cartões que já têm bandeira.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Card.objects.order_by('pk').only('id', 'card_number', 'card_brand', 'card_type')
+        if not options['all']:
+            queryset = queryset.filter(card_brand__isnull=True)
+
+        last_pk = 0
+        scanned = updated = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            scanned += len(batch)
+
+            changed = []
+            for card in batch:
+                match = detect_card_brand(card.card_number)
+                brand = match.brand if match else None
+                card_type = match.card_type if match else None
+                if (card.card_brand, card.card_type) != (brand, card_type):
+                    card.card_brand, card.card_type = brand, card_type
+                    changed.append(card)
+            if changed:
+                Card.objects.bulk_update(changed, ['card_brand', 'card_type'])
+                updated += len(changed)
+
+        self.stdout.write(self.style.SUCCESS(f'{scanned} cartões verificados, {updated} atualizados.'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from app.menus import rebuild_menu
+from app.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os cardápios pré-renderizados (todos ou só os restaurantes informados).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('restaurant_ids', nargs='*', type=int)
+
+    def handle(self, *args, **options):
+        restaurant_ids = options['restaurant_ids'] or Restaurant.objects.order_by('pk').values_list('pk', flat=True)
+        rebuilt = 0
+        for restaurant_id in restaurant_ids:
+            if rebuild_menu(restaurant_id) is not None:
+                rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'{rebuilt} cardápios reconstruídos.'))
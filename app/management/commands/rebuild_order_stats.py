@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from app.order_stats import rebuild_order_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula as estatísticas de pedidos de todos os usuários (contagem, total gasto, '
+        'restaurante favorito) a partir dos pedidos quentes e arquivados.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Usuários por transação.')
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_order_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Estatísticas recalculadas para {rebuilt} usuários.'))
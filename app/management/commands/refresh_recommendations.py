@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from app.recommendations import refresh_recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Atualiza as recomendações "pedidos junto" com os pedidos novos desde a '
+        'última execução. Feito para rodar periodicamente (ex: cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Reprocessa todo o histórico de pedidos.')
+        parser.add_argument('--top-k', type=int, default=None)
+
+    def handle(self, *args, **options):
+        refreshed = refresh_recommendations(full=options['full'], top_k=options['top_k'])
+        self.stdout.write(self.style.SUCCESS(f'Recomendações recalculadas para {refreshed} pratos.'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from app.eta import reseed_pending
+from app.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconta no banco a fila de pedidos pendentes de cada restaurante e regrava os '
+        'contadores de carga usados na estimativa de entrega.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Restaurantes por consulta.')
+
+    def handle(self, *args, **options):
+        restaurant_ids = list(Restaurant.objects.order_by('pk').values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        for start in range(0, len(restaurant_ids), batch_size):
+            reseed_pending(restaurant_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f'Fila de pendentes recontada para {len(restaurant_ids)} restaurantes.'))
@@ -0,0 +1,184 @@
+# app/menus.py
+
+import gzip
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .fast_json import _decimal, render
+from .models import Dish, Restaurant, RestaurantMenu
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATEGORY = Dish._meta.get_field('category').default
+
+
+# ===================================================================
+# DOCUMENTO
+# ===================================================================
+
+def _category_key(name):
+    # Ordem alfabética, com a categoria padrão ("Outros") no fim.
+    return (name == DEFAULT_CATEGORY, name.casefold())
+
+
+def build_menu_document(restaurant):
+    """
+    Cardápio agrupado por categoria. O estoque fica de fora: muda a cada
+    pedido e invalidaria o documento o tempo todo.
+    """
+    categories = {}
+    dishes = (
+        Dish.objects.filter(restaurant=restaurant)
+        .order_by('name', 'id')
+        .values('id', 'name', 'description', 'price', 'category', 'image')
+    )
+    for dish in dishes:
+        categories.setdefault(dish['category'], []).append({
+            'id': dish['id'],
+            'name': dish['name'],
+            'description': dish['description'],
+            'price': _decimal(dish['price']),
+            'image': dish['image'],
+        })
+    return {
+        'restaurant': {
+            'id': restaurant.id,
+            'name': restaurant.name,
+            'description': restaurant.description,
+            'image': restaurant.image,
+        },
+        'categories': [
+            {'name': name, 'dishes': categories[name]}
+            for name in sorted(categories, key=_category_key)
+        ],
+    }
+
+
+def rebuild_menu(restaurant_id):
+    """
+    Gera e grava o documento do restaurante com as versões comprimidas.
+    Retorna o RestaurantMenu, ou None se o restaurante não existe mais.
+    """
+    restaurant = Restaurant.objects.filter(pk=restaurant_id).first()
+    if restaurant is None:
+        RestaurantMenu.objects.filter(restaurant_id=restaurant_id).delete()
+        return None
+
+    content = render(build_menu_document(restaurant))
+    menu, _ = RestaurantMenu.objects.update_or_create(
+        restaurant=restaurant,
+        defaults={
+            'etag': hashlib.sha1(content).hexdigest(),
+            'content': content,
+            'content_gzip': gzip.compress(content, compresslevel=9, mtime=0),
+            'content_brotli': brotli.compress(content, quality=11) if brotli is not None else None,
+        },
+    )
+    return menu
+
+
+# ===================================================================
+# RECONSTRUÇÃO EM SEGUNDO PLANO
+# ===================================================================
+
+_executor = None
+_executor_lock = threading.Lock()
+_scheduled = set()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='menus')
+    return _executor
+
+
+def _run_rebuild(restaurant_id):
+    # Sai do conjunto antes de reconstruir: mudanças feitas durante a
+    # reconstrução agendam outra.
+    with _executor_lock:
+        _scheduled.discard(restaurant_id)
+    close_old_connections()
+    try:
+        rebuild_menu(restaurant_id)
+    except Exception:
+        logger.exception('Erro ao reconstruir o cardápio do restaurante %s', restaurant_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_menu_rebuild(restaurant_id):
+    """
+    Agenda a reconstrução do cardápio. Várias mudanças seguidas no mesmo
+    restaurante (ex.: importação de pratos) viram uma única reconstrução.
+    Com settings.MENU_REBUILD_ASYNC desligado, reconstrói na hora.
+    """
+    if not getattr(settings, 'MENU_REBUILD_ASYNC', True):
+        rebuild_menu(restaurant_id)
+        return
+    with _executor_lock:
+        if restaurant_id in _scheduled:
+            return
+        _scheduled.add(restaurant_id)
+    get_executor().submit(_run_rebuild, restaurant_id)
+
+
+# ===================================================================
+# LEITURA
+# ===================================================================
+
+# Sem o pacote brotli a coluna content_brotli fica sempre vazia: nem entra
+# como candidata, para não gastar uma consulta com ela.
+ENCODINGS = (
+    *((('br', 'content_brotli'),) if brotli is not None else ()),
+    ('gzip', 'content_gzip'),
+)
+
+
+def accepted_encodings(header):
+    """
+    Codificações aceitas no Accept-Encoding (ignorando as com q=0).
+    """
+    accepted = set()
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q=') and quality[2:].strip() in ('0', '0.0', '0.00', '0.000'):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def get_menu_variant(restaurant_id, accept_encoding):
+    """
+    Retorna (etag, encoding, conteúdo) lendo só a coluna da melhor
+    codificação aceita pelo cliente (encoding None = JSON sem compressão).
+    Gera o documento na hora se ele ainda não existe. Retorna None se o
+    restaurante não existe.
+    """
+    accepted = accepted_encodings(accept_encoding)
+    candidates = [(name, column) for name, column in ENCODINGS if name in accepted or '*' in accepted]
+    candidates.append((None, 'content'))
+
+    queryset = RestaurantMenu.objects.filter(restaurant_id=restaurant_id)
+    for encoding, column in candidates:
+        row = queryset.values_list('etag', column).first()
+        if row is None:
+            if rebuild_menu(restaurant_id) is None:
+                return None
+            row = queryset.values_list('etag', column).first()
+        etag, content = row
+        if content is not None:
+            return etag, encoding, bytes(content)
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-19 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_order_payment_method_order_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='delivery_radius_km',
+            field=models.FloatField(default=5),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
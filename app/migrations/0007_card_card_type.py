@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 00:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_restaurant_delivery_radius_km_restaurant_geohash_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='card',
+            name='card_type',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-19 00:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_card_card_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DishCooccurrence',
+            fields=[
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cooccurrence', serialize=False, to='app.restaurant')),
+                ('matrix', models.BinaryField()),
+                ('last_order_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DishRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('dish', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='app.dish')),
+                ('recommended', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='app.dish')),
+            ],
+            options={
+                'ordering': ['dish', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('dish', 'rank'), name='unique_dish_recommendation_rank')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 00:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_alter_dish_category_order_order_status_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dish',
+            name='stock',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
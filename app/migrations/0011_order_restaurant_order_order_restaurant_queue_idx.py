@@ -0,0 +1,54 @@
+# Generated by Django 5.1.7 on 2026-10-19 00:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_order_restaurant(apps, schema_editor):
+    """
+    Preenche Order.restaurant a partir do prato do primeiro item, em lotes
+    por faixa de id para não travar a tabela de pedidos inteira.
+    """
+    Order = apps.get_model('app', 'Order')
+    OrderItem = apps.get_model('app', 'OrderItem')
+    first_item_restaurant = (
+        OrderItem.objects.filter(order_id=OuterRef('pk')).order_by('pk').values('dish__restaurant_id')[:1]
+    )
+
+    last_pk = 0
+    while True:
+        pks = list(
+            Order.objects.filter(pk__gt=last_pk, restaurant__isnull=True)
+            .order_by('pk').values_list('pk', flat=True)[:BACKFILL_BATCH_SIZE]
+        )
+        if not pks:
+            break
+        Order.objects.filter(pk__in=pks).update(restaurant_id=Subquery(first_item_restaurant))
+        last_pk = pks[-1]
+
+
+class Migration(migrations.Migration):
+    # Cada lote do backfill é commitado separadamente.
+    atomic = False
+
+    dependencies = [
+        ('app', '0010_dish_stock'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='restaurant',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='app.restaurant'),
+        ),
+        migrations.RunPython(backfill_order_restaurant, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['restaurant', 'status', 'created_at'], name='order_restaurant_queue_idx'),
+        ),
+    ]
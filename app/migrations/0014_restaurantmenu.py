@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-19 01:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_userorderstats_userrestaurantordercount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RestaurantMenu',
+            fields=[
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='menu', serialize=False, to='app.restaurant')),
+                ('etag', models.CharField(max_length=64)),
+                ('content', models.BinaryField()),
+                ('content_gzip', models.BinaryField()),
+                ('content_brotli', models.BinaryField(null=True)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
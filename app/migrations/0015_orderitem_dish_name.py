@@ -0,0 +1,50 @@
+# Generated by Django 5.1.7 on 2026-10-19 01:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_dish_name(apps, schema_editor):
+    """
+    Copia o nome atual do prato para os itens existentes, em lotes por faixa
+    de id.
+    """
+    Dish = apps.get_model('app', 'Dish')
+    OrderItem = apps.get_model('app', 'OrderItem')
+    dish_name = Dish.objects.filter(pk=OuterRef('dish_id')).values('name')[:1]
+
+    last_pk = 0
+    while True:
+        pks = list(
+            OrderItem.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:BACKFILL_BATCH_SIZE]
+        )
+        if not pks:
+            break
+        OrderItem.objects.filter(pk__in=pks).update(dish_name=Subquery(dish_name))
+        last_pk = pks[-1]
+
+
+class Migration(migrations.Migration):
+    # Cada lote do backfill é commitado separadamente.
+    atomic = False
+
+    dependencies = [
+        ('app', '0014_restaurantmenu'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='dish_name',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.RunPython(backfill_dish_name, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='dish',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='app.dish'),
+        ),
+    ]
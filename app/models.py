@@ -4,6 +4,8 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from .geo import encode_geohash, get_geocoder
+
 class Profile(models.Model):
     USER_ROLE_CHOICES = (
         ('cliente', 'Cliente'),
@@ -29,20 +31,106 @@ class Restaurant(models.Model):
     delivery_time = models.IntegerField(default=30)
     image = models.URLField(max_length=500, blank=True, null=True)
 
+    # Localização e área de entrega
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    delivery_radius_km = models.FloatField(default=5)
+    geohash = models.CharField(max_length=12, blank=True, default='', db_index=True, editable=False)
+
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Endereço e coordenadas carregados, para o save() detectar uma troca
+        # de endereço.
+        if {'address', 'latitude', 'longitude'} <= set(field_names):
+            instance._loaded_location = (instance.address, instance.latitude, instance.longitude)
+        return instance
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, '_loaded_location', None)
+        if loaded is not None and self.address != loaded[0] and (self.latitude, self.longitude) == loaded[1:]:
+            # Endereço novo sem coordenadas novas: as antigas não valem mais.
+            self.latitude = self.longitude = None
+
+        if (self.latitude is None or self.longitude is None) and self.address:
+            coords = get_geocoder().geocode(self.address)
+            if coords is not None:
+                self.latitude, self.longitude = coords
+
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'address', 'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'latitude', 'longitude', 'geohash'}
+        super().save(*args, **kwargs)
+        self._loaded_location = (self.address, self.latitude, self.longitude)
+
 class Dish(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField()
     price = models.DecimalField(max_digits=6, decimal_places=2)
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='dishes')
-    category = models.CharField(max_length=100, default='Outros')
+    category = models.CharField(max_length=100, default='Outros', db_index=True)
     image = models.URLField(max_length=500, blank=True, null=True)
+    # Quantidade disponível. Nulo significa sem controle de estoque.
+    stock = models.PositiveIntegerField(blank=True, null=True)
     
     def __str__(self):
         return f'{self.name} ({self.restaurant.name})'
 
+class DishCooccurrence(models.Model):
+    """
+    Matriz esparsa de co-ocorrência dos pratos de um restaurante (em quantos
+    pedidos cada par de pratos apareceu junto), serializada em formato COO.
+    `last_order_id` marca até onde o histórico já foi processado.
+    """
+    restaurant = models.OneToOneField(Restaurant, on_delete=models.CASCADE, primary_key=True, related_name='cooccurrence')
+    matrix = models.BinaryField()
+    last_order_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+class RestaurantMenu(models.Model):
+    """
+    Cardápio do restaurante já agrupado por categoria, guardado pronto para
+    servir: JSON e as versões comprimidas (ver app/menus.py). Reconstruído
+    em segundo plano quando os pratos ou o restaurante mudam.
+    """
+    restaurant = models.OneToOneField(Restaurant, on_delete=models.CASCADE, primary_key=True, related_name='menu')
+    etag = models.CharField(max_length=64)
+    content = models.BinaryField()
+    content_gzip = models.BinaryField()
+    # Nulo quando o módulo brotli não está instalado.
+    content_brotli = models.BinaryField(null=True)
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Cardápio de {self.restaurant_id}'
+
+class DishRecommendation(models.Model):
+    """
+    Os K pratos mais pedidos junto com `dish`, pré-calculados a partir da
+    matriz de co-ocorrência.
+    """
+    dish = models.ForeignKey(Dish, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(Dish, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['dish', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['dish', 'rank'], name='unique_dish_recommendation_rank'),
+        ]
+
+    def __str__(self):
+        return f'{self.dish_id} -> {self.recommended_id} (#{self.rank})'
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('P', 'Pendente'),
@@ -55,6 +143,11 @@ class Order(models.Model):
     
     # Campo de usuário
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders', null=True)
+    # Restaurante do pedido, denormalizado a partir dos itens. O índice próprio
+    # da FK é dispensado porque o índice composto de Meta começa por ele.
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.SET_NULL, related_name='orders', null=True, blank=True, db_index=False,
+    )
     status = models.CharField(max_length=1, choices=STATUS_CHOICES, default='P')
     created_at = models.DateTimeField(auto_now_add=True)
     total = models.DecimalField(max_digits=8, decimal_places=2, default=0.00)
@@ -62,17 +155,106 @@ class Order(models.Model):
     # Campo de método de pagamento
     payment_method = models.CharField(max_length=50, choices=PAYMENT_CHOICES, default='card')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-created_at'], name='order_status_created_idx'),
+            models.Index(fields=['restaurant', 'status', 'created_at'], name='order_restaurant_queue_idx'),
+        ]
+
     def __str__(self):
         return f'Order #{self.id}'
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
-    dish = models.ForeignKey(Dish, on_delete=models.CASCADE)
+    # O item sobrevive à remoção do prato (fica sem prato, com o nome salvo).
+    dish = models.ForeignKey(Dish, on_delete=models.SET_NULL, null=True)
+    dish_name = models.CharField(max_length=100, blank=True)
+    quantity = models.PositiveIntegerField(default=1)
+    price = models.DecimalField(max_digits=6, decimal_places=2)
+
+    def save(self, *args, **kwargs):
+        if not self.dish_name and self.dish is not None:
+            self.dish_name = self.dish.name
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f'{self.quantity}x {self.dish_name}'
+
+class ArchivedOrder(models.Model):
+    """
+    Pedido completo movido para fora das tabelas quentes (ver app/archive.py).
+    Mantém o id original, então ids de pedidos continuam únicos entre as tabelas.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_orders', null=True)
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.SET_NULL, related_name='archived_orders', null=True, blank=True,
+    )
+    status = models.CharField(max_length=1, choices=Order.STATUS_CHOICES, default='C')
+    created_at = models.DateTimeField()
+    total = models.DecimalField(max_digits=8, decimal_places=2, default=0.00)
+    payment_method = models.CharField(max_length=50, choices=Order.PAYMENT_CHOICES, default='card')
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_order_user_idx'),
+        ]
+
+    def __str__(self):
+        return f'Order #{self.id} (arquivado)'
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    # Sem constraint: o histórico arquivado sobrevive à remoção do prato.
+    dish = models.ForeignKey(
+        Dish, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+', null=True,
+    )
+    dish_name = models.CharField(max_length=100)
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=6, decimal_places=2)
 
     def __str__(self):
-        return f'{self.quantity}x {self.dish.name}'
+        return f'{self.quantity}x {self.dish_name}'
+
+class UserOrderStats(models.Model):
+    """
+    Resumo dos pedidos do usuário para a tela de perfil, mantido pelos signals
+    de Order na mesma transação do pedido (ver app/order_stats.py) e
+    recalculável com `manage.py rebuild_order_stats`. Inclui os arquivados.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='order_stats')
+    order_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    # Soma dos pedidos completos.
+    total_spent = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    favorite_restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.SET_NULL, related_name='+', null=True, blank=True,
+    )
+    favorite_restaurant_orders = models.PositiveIntegerField(default=0)
+    last_order_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Estatísticas de {self.user_id}'
+
+class UserRestaurantOrderCount(models.Model):
+    """
+    Pedidos de cada usuário por restaurante, para achar o favorito sem
+    agregar o histórico.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='+')
+    order_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'restaurant'], name='unique_user_restaurant_order_count'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} @ {self.restaurant_id}: {self.order_count}'
 
 class Card(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cards')
@@ -81,6 +263,7 @@ class Card(models.Model):
     expiry_date = models.CharField(max_length=5)
     cvv = models.CharField(max_length=4)
     card_brand = models.CharField(max_length=50, blank=True, null=True)
+    card_type = models.CharField(max_length=20, blank=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     last_modified = models.DateTimeField(auto_now=True)
@@ -0,0 +1,139 @@
+# app/order_stats.py
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q, Subquery, Sum
+
+from .models import ArchivedOrder, Order, UserOrderStats, UserRestaurantOrderCount
+
+
+def _increment(model, lookup, increments, values=None):
+    """
+    UPDATE ... SET campo = campo + n (e os `values` fixos); cria a linha se
+    ela ainda não existe.
+    """
+    values = values or {}
+    expressions = {field: F(field) + amount for field, amount in increments.items()}
+    expressions.update(values)
+    if model.objects.filter(**lookup).update(**expressions):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **increments, **values)
+    except IntegrityError:
+        # Criada por outra transação entre o UPDATE e o INSERT.
+        model.objects.filter(**lookup).update(**expressions)
+
+
+# ===================================================================
+# ATUALIZAÇÃO INCREMENTAL (CHAMADA PELOS SIGNALS DE Order)
+# ===================================================================
+
+def record_order_created(order):
+    with transaction.atomic():
+        _increment(UserOrderStats, {'user_id': order.user_id}, {'order_count': 1}, {'last_order_at': order.created_at})
+        if order.restaurant_id is None:
+            return
+        _increment(
+            UserRestaurantOrderCount, {'user_id': order.user_id, 'restaurant_id': order.restaurant_id},
+            {'order_count': 1},
+        )
+        # Troca o favorito só se este restaurante passou o atual (empates
+        # mantêm o favorito que chegou primeiro à contagem).
+        restaurant_orders = Subquery(
+            UserRestaurantOrderCount.objects.filter(
+                user_id=order.user_id, restaurant_id=order.restaurant_id,
+            ).values('order_count')
+        )
+        UserOrderStats.objects.filter(
+            user_id=order.user_id, favorite_restaurant_orders__lt=restaurant_orders,
+        ).update(favorite_restaurant_id=order.restaurant_id, favorite_restaurant_orders=restaurant_orders)
+
+
+def record_order_completed(order):
+    _increment(UserOrderStats, {'user_id': order.user_id}, {'completed_count': 1, 'total_spent': order.total})
+
+
+def record_order_reopened(order):
+    # Inverso exato de record_order_completed (pedido voltou de 'C').
+    _increment(UserOrderStats, {'user_id': order.user_id}, {'completed_count': -1, 'total_spent': -order.total})
+
+
+# ===================================================================
+# RECONSTRUÇÃO
+# ===================================================================
+
+def _aggregate(model, user_ids, per_user, per_restaurant):
+    orders = model.objects.filter(user_id__in=user_ids)
+    rows = orders.values('user_id').annotate(
+        order_count=Count('id'),
+        completed_count=Count('id', filter=Q(status='C')),
+        total_spent=Sum('total', filter=Q(status='C')),
+        last_order_at=Max('created_at'),
+    )
+    for row in rows:
+        stats = per_user[row['user_id']]
+        stats['order_count'] += row['order_count']
+        stats['completed_count'] += row['completed_count']
+        stats['total_spent'] += row['total_spent'] or Decimal('0')
+        if stats['last_order_at'] is None or stats['last_order_at'] < row['last_order_at']:
+            stats['last_order_at'] = row['last_order_at']
+    rows = orders.exclude(restaurant_id=None).values('user_id', 'restaurant_id').annotate(order_count=Count('id'))
+    for row in rows:
+        per_restaurant[row['user_id'], row['restaurant_id']] += row['order_count']
+
+
+def rebuild_user_stats(user_ids):
+    """
+    Recalcula do zero as estatísticas dos usuários informados, a partir dos
+    pedidos quentes e arquivados, numa única transação.
+    """
+    with transaction.atomic():
+        per_user = defaultdict(lambda: {
+            'order_count': 0, 'completed_count': 0, 'total_spent': Decimal('0'), 'last_order_at': None,
+        })
+        per_restaurant = defaultdict(int)
+        _aggregate(Order, user_ids, per_user, per_restaurant)
+        _aggregate(ArchivedOrder, user_ids, per_user, per_restaurant)
+
+        favorites = {}
+        for (user_id, restaurant_id), count in sorted(per_restaurant.items()):
+            if count > favorites.get(user_id, (None, 0))[1]:
+                favorites[user_id] = (restaurant_id, count)
+
+        UserRestaurantOrderCount.objects.filter(user_id__in=user_ids).delete()
+        UserOrderStats.objects.filter(user_id__in=user_ids).delete()
+        UserRestaurantOrderCount.objects.bulk_create([
+            UserRestaurantOrderCount(user_id=user_id, restaurant_id=restaurant_id, order_count=count)
+            for (user_id, restaurant_id), count in per_restaurant.items()
+        ])
+        UserOrderStats.objects.bulk_create([
+            UserOrderStats(
+                user_id=user_id,
+                favorite_restaurant_id=favorites.get(user_id, (None, 0))[0],
+                favorite_restaurant_orders=favorites.get(user_id, (None, 0))[1],
+                **stats,
+            )
+            for user_id, stats in per_user.items()
+        ])
+    return len(per_user)
+
+
+def rebuild_order_stats(batch_size=500):
+    """
+    Recalcula as estatísticas de todos os usuários, em lotes de
+    `batch_size` usuários (uma transação curta por lote).
+    """
+    rebuilt = 0
+    last_id = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not user_ids:
+            return rebuilt
+        rebuilt += rebuild_user_stats(user_ids)
+        last_id = user_ids[-1]
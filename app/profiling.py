@@ -0,0 +1,224 @@
+# app/profiling.py
+
+import cProfile
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAM = 'profile'
+INTERVAL_PARAM = 'profile_interval'
+FORMATS = ('folded', 'pstats')
+
+# Categorias do X-Profile-Summary. Cada amostra vai para a primeira regra que
+# casar com algum frame, procurando do frame mais interno para o mais externo.
+CATEGORIES = (
+    ('db', ('django/db/', 'sqlite3', 'psycopg')),
+    ('jwt', ('rest_framework_simplejwt/',)),
+    ('serializers', ('rest_framework/serializers.py', 'rest_framework/fields.py',
+                     'rest_framework/relations.py', 'app/serializers.py', 'app/fast_json.py')),
+    ('view', ('app/',)),
+    ('middleware', ('django/', 'corsheaders/', 'whitenoise/', 'rest_framework/')),
+)
+
+_busy = threading.Lock()
+
+
+def _normalize(path):
+    return path.replace(os.sep, '/')
+
+
+def _frame_label(code):
+    # pacote/arquivo.py:função, curto mas sem ambiguidade entre pacotes.
+    path = _normalize(code.co_filename).rsplit('/', 2)[-2:]
+    return f'{"/".join(path)}:{code.co_name}'
+
+
+def categorize(filenames):
+    """
+    Classifica uma amostra pela lista de arquivos da pilha (do mais interno
+    para o mais externo).
+    """
+    for category, markers in CATEGORIES:
+        for filename in filenames:
+            if any(marker in filename for marker in markers):
+                return category
+    return 'other'
+
+
+class StackSampler:
+    """
+    Amostrador de pilha: uma thread lê o frame atual da thread da requisição
+    (sys._current_frames) a cada `interval` segundos e conta as pilhas no
+    formato "folded" (uma linha por pilha, frames separados por `;`), pronto
+    para flamegraph.pl / speedscope.
+    """
+
+    def __init__(self, thread_id, interval, skip_frames=0):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.skip_frames = skip_frames
+        self.stacks = Counter()
+        self.categories = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels, filenames = [], []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                filenames.append(_normalize(frame.f_code.co_filename))
+                frame = frame.f_back
+            if filenames[0] == _normalize(__file__):
+                continue
+            self.stacks[';'.join(reversed(labels[:len(labels) - self.skip_frames]))] += 1
+            self.categories[categorize(filenames)] += 1
+            self.samples += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self, elapsed):
+        # Distribui o tempo real pela proporção de amostras: com o GIL, a
+        # thread do amostrador nem sempre acorda no intervalo pedido.
+        if not self.samples:
+            return {}
+        return {
+            category: round(elapsed * 1000 * count / self.samples, 1)
+            for category, count in self.categories.most_common()
+        }
+
+    def dump(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common()).encode()
+
+
+class ProfilingMiddleware:
+    """
+    Perfil de CPU sob demanda para uma única requisição, só para staff.
+    Basta enviar o cabeçalho `X-Profile: folded|pstats` (ou `?profile=...`):
+    a resposta vira o arquivo do perfil para download, com o tempo por
+    categoria (middleware, jwt, view, serializers, db) em X-Profile-Summary.
+
+    - folded: pilhas amostradas a cada settings.PROFILING_SAMPLE_INTERVAL_MS
+      (ajustável por `?profile_interval=`, dentro dos limites configurados),
+      com custo baixo o suficiente para produção.
+    - pstats: cProfile determinístico (abre com `python -m pstats`), mais
+      preciso mas bem mais lento.
+
+    Fica fora da pilha de middlewares sem settings.PROFILING_ENABLED. Deve ser
+    o primeiro da lista para medir também os outros middlewares. Apenas uma
+    requisição é perfilada por vez em cada processo.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.default_interval = getattr(settings, 'PROFILING_SAMPLE_INTERVAL_MS', 1.0)
+        self.min_interval, self.max_interval = getattr(settings, 'PROFILING_SAMPLE_INTERVAL_RANGE_MS', (0.5, 50.0))
+        self.authenticator = JWTAuthentication()
+
+    def requested_format(self, request):
+        value = request.META.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM)
+        if not value:
+            return None
+        value = value.lower()
+        return value if value in FORMATS else 'folded'
+
+    def interval(self, request):
+        try:
+            interval = float(request.GET.get(INTERVAL_PARAM, self.default_interval))
+        except ValueError:
+            interval = self.default_interval
+        return min(max(interval, self.min_interval), self.max_interval) / 1000
+
+    def is_staff(self, request):
+        # Roda antes do DRF e do AuthenticationMiddleware: valida o JWT aqui
+        # (o JWT do perfil não entra na medição). Sem JWT, não há perfil.
+        try:
+            result = self.authenticator.authenticate(request)
+        except (AuthenticationFailed, InvalidToken):
+            return False
+        return result is not None and result[0].is_staff
+
+    def __call__(self, request):
+        profile_format = self.requested_format(request)
+        if profile_format is None or not self.is_staff(request):
+            return self.get_response(request)
+        if not _busy.acquire(blocking=False):
+            response = self.get_response(request)
+            response['X-Profile-Error'] = 'Outro perfil está em andamento neste processo.'
+            return response
+        try:
+            if profile_format == 'pstats':
+                return self.profile_pstats(request)
+            return self.profile_folded(request)
+        finally:
+            _busy.release()
+
+    def profile_folded(self, request):
+        # As pilhas começam no get_response: os frames do servidor acima deste
+        # (e este) são descartados.
+        depth, frame = 0, sys._getframe()
+        while frame is not None:
+            depth, frame = depth + 1, frame.f_back
+        sampler = StackSampler(threading.get_ident(), self.interval(request), skip_frames=depth)
+        started = time.perf_counter()
+        with sampler:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        return self.download(request, response, sampler.dump(), 'text/plain', 'folded', elapsed, sampler.summary(elapsed), {
+            'X-Profile-Samples': str(sampler.samples),
+            'X-Profile-Interval-Ms': str(sampler.interval * 1000),
+        })
+
+    def profile_pstats(self, request):
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        elapsed = time.perf_counter() - started
+        profiler.create_stats()
+        summary = Counter()
+        for (filename, _, function), (_, _, total_time, _, _) in profiler.stats.items():
+            # Funções em C (filename '~') trazem o módulo no nome, ex.: sqlite3.Cursor.
+            summary[categorize([f'{_normalize(filename)}:{function}'])] += total_time
+        summary = {category: round(seconds * 1000, 1) for category, seconds in summary.most_common()}
+        return self.download(request, response, marshal.dumps(profiler.stats), 'application/octet-stream', 'prof', elapsed, summary)
+
+    def download(self, request, response, content, content_type, extension, elapsed, summary, extra_headers=None):
+        if response.streaming:
+            response['X-Profile-Error'] = 'Respostas em stream não podem ser perfiladas.'
+            return response
+        name = request.path.strip('/').replace('/', '-') or 'root'
+        download = HttpResponse(content, content_type=content_type)
+        download['Content-Disposition'] = f'attachment; filename="{name}-{int(time.time())}.{extension}"'
+        download['X-Profile-Status'] = str(response.status_code)
+        download['X-Profile-Elapsed-Ms'] = f'{elapsed * 1000:.1f}'
+        download['X-Profile-Summary'] = ';'.join(f'{category}={ms}ms' for category, ms in summary.items())
+        for header, value in (extra_headers or {}).items():
+            download[header] = value
+        return download
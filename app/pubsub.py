@@ -0,0 +1,100 @@
+# app/pubsub.py
+
+import asyncio
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """
+    Assinatura de um canal. Recebe as mensagens publicadas numa fila
+    assíncrona ligada ao event loop de quem assinou.
+    """
+
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, message):
+        # Chamado dentro do event loop do assinante. Se o cliente não estiver
+        # consumindo, descarta a mensagem em vez de crescer sem limite.
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+    async def get(self, timeout=None):
+        """
+        Aguarda a próxima mensagem. Retorna None se o timeout expirar.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InMemoryBroker:
+    """
+    Pub/sub local, em memória, válido apenas dentro de um processo.
+
+    `publish` pode ser chamado de qualquer thread (views síncronas, signals);
+    a entrega é agendada no event loop de cada assinante.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.queue_size)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.channel)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscriptions[subscription.channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # Event loop já encerrado: a conexão caiu sem cancelar a assinatura.
+                self.unsubscribe(subscription)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    Retorna a instância do broker configurado em settings.PUBSUB_BACKEND.
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                backend = import_string(getattr(settings, 'PUBSUB_BACKEND', 'app.pubsub.InMemoryBroker'))
+                _broker = backend(**getattr(settings, 'PUBSUB_OPTIONS', {}))
+    return _broker
+
+
+def user_orders_channel(user_id):
+    return f'orders:user:{user_id}'
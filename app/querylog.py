@@ -0,0 +1,213 @@
+# app/querylog.py
+
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+import traceback
+from collections import deque
+
+from asgiref.local import Local
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import request_finished
+from django.db import connection
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_STRING = re.compile(r"'(?:''|[^'])*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """
+    Normaliza a consulta trocando literais e listas de parâmetros por `?`,
+    para que consultas com o mesmo formato caiam no mesmo grupo.
+    Retorna (hash curto, SQL normalizado).
+    """
+    normalized = _STRING.sub('?', sql)
+    normalized = _NUMBER.sub('?', normalized)
+    normalized = _PLACEHOLDER.sub('?', normalized)
+    normalized = _IN_LIST.sub('(...)', normalized)
+    normalized = _WHITESPACE.sub(' ', normalized).strip()
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12], normalized
+
+
+class QueryLog:
+    """
+    Buffer circular (por processo) com as consultas lentas mais recentes.
+    """
+
+    def __init__(self, size):
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def entries(self):
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def groups(self):
+        groups = {}
+        for entry in reversed(self.entries()):
+            group = groups.get(entry['fingerprint'])
+            if group is None:
+                group = groups[entry['fingerprint']] = {
+                    'fingerprint': entry['fingerprint'],
+                    'normalized_sql': entry['normalized_sql'],
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'views': [],
+                    'last_explain': None,
+                }
+            group['count'] += 1
+            group['total_ms'] += entry['duration_ms']
+            group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+            if entry['view'] not in group['views']:
+                group['views'].append(entry['view'])
+            if entry['explain'] is not None:
+                group['last_explain'] = entry['explain']
+        for group in groups.values():
+            group['avg_ms'] = group['total_ms'] / group['count']
+        return sorted(groups.values(), key=lambda group: -group['total_ms'])
+
+
+query_log = QueryLog(getattr(settings, 'SLOW_QUERY_LOG_SIZE', 500))
+
+
+def _app_frames():
+    """
+    Frames da pilha que estão no código do app (views, serializers...),
+    do mais externo ao mais interno.
+    """
+    frames = []
+    for frame in traceback.extract_stack():
+        if frame.filename.startswith(APP_DIR) and not frame.filename.endswith('querylog.py'):
+            frames.append(f'{os.path.relpath(frame.filename, os.path.dirname(APP_DIR))}:{frame.lineno} in {frame.name}')
+    return frames
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    view_class = getattr(match.func, 'cls', None) or getattr(match.func, 'view_class', None)
+    if view_class is not None:
+        return f'{view_class.__module__}.{view_class.__name__}'
+    return f'{match.func.__module__}.{match.func.__name__}'
+
+
+class SlowQueryRecorder:
+    """
+    execute_wrapper que mede cada consulta da requisição e guarda as que
+    passam do limite. O EXPLAIN fica para depois da resposta (ver explain_pending).
+
+    Os parâmetros nunca vão para o log (podem ter senhas, cartões...): só os
+    dos SELECTs ficam guardados, em memória, até o EXPLAIN.
+    """
+
+    def __init__(self, request, threshold_ms):
+        self.request = request
+        self.threshold_ms = threshold_ms
+        self.slow_queries = []
+        self._explain_params = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms >= self.threshold_ms:
+            frames = _app_frames()
+            key, normalized = fingerprint(sql)
+            if not many and sql.lstrip().upper().startswith('SELECT'):
+                self._explain_params[len(self.slow_queries)] = params
+            self.slow_queries.append({
+                'fingerprint': key,
+                'normalized_sql': normalized,
+                'sql': sql,
+                'duration_ms': round(duration_ms, 3),
+                'method': self.request.method,
+                'path': self.request.path,
+                'view': _view_name(self.request),
+                'frame': frames[-1] if frames else None,
+                'stack': frames,
+                'explain': None,
+                'analyzed': False,
+                'timestamp': time.time(),
+            })
+        return result
+
+    def explain(self, analyze_rate):
+        for index, entry in enumerate(self.slow_queries):
+            params = self._explain_params.pop(index, None)
+            if params is not None:
+                analyze = connection.vendor == 'postgresql' and random.random() < analyze_rate
+                try:
+                    prefix = connection.ops.explain_query_prefix(analyze=True) if analyze else connection.ops.explain_query_prefix()
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'{prefix} {entry["sql"]}', params)
+                        rows = cursor.fetchall()
+                except Exception as exc:
+                    entry['explain'] = f'EXPLAIN falhou: {exc}'
+                else:
+                    entry['explain'] = '\n'.join(' '.join(str(column) for column in row) for row in rows)
+                    entry['analyzed'] = analyze
+            query_log.add(entry)
+
+
+class SlowQueryMiddleware:
+    """
+    Registra as consultas acima de settings.SLOW_QUERY_THRESHOLD_MS com a view
+    e o frame do app que as originou, mais o plano de execução. Opt-in por
+    settings.SLOW_QUERY_LOG_ENABLED; desligado, sai da pilha de middlewares.
+
+    Só instrumenta a conexão da thread da requisição (não as sub-requisições
+    paralelas do /api/batch/).
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SLOW_QUERY_LOG_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.threshold_ms = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100)
+        self.analyze_rate = getattr(settings, 'SLOW_QUERY_EXPLAIN_ANALYZE_RATE', 0.0)
+        request_finished.connect(explain_pending, dispatch_uid='app.querylog.explain_pending')
+
+    def __call__(self, request):
+        recorder = SlowQueryRecorder(request, self.threshold_ms)
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        if recorder.slow_queries:
+            _pending.explain = (recorder, self.analyze_rate)
+        return response
+
+
+_pending = Local()
+
+
+def explain_pending(**kwargs):
+    """
+    Receiver de request_finished: roda o EXPLAIN das consultas lentas da
+    requisição depois que o servidor enviou a resposta. Se a conexão já foi
+    fechada pelo close_old_connections, o EXPLAIN abre outra, fechada no
+    próximo request_started como de costume.
+    """
+    pending = getattr(_pending, 'explain', None)
+    if pending is None:
+        return
+    _pending.explain = None
+    recorder, analyze_rate = pending
+    recorder.explain(analyze_rate)
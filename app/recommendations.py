@@ -0,0 +1,156 @@
+# app/recommendations.py
+
+import io
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Dish, DishCooccurrence, DishRecommendation, Order, OrderItem
+
+ORDER_CHUNK_SIZE = 5000 # Pedidos por bloco na multiplicação da matriz
+
+
+def _load_matrix(state):
+    """
+    Reconstrói a matriz densa (pratos x pratos) a partir do COO salvo.
+    Retorna (ids dos pratos, matriz).
+    """
+    if state is None or not state.matrix:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.int64)
+    data = np.load(io.BytesIO(bytes(state.matrix)))
+    dish_ids = data['dish_ids']
+    matrix = np.zeros((len(dish_ids), len(dish_ids)), dtype=np.int64)
+    matrix[data['rows'], data['cols']] = data['counts']
+    return dish_ids, matrix
+
+
+def _dump_matrix(dish_ids, matrix):
+    rows, cols = np.nonzero(matrix)
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, dish_ids=dish_ids, rows=rows, cols=cols, counts=matrix[rows, cols])
+    return buffer.getvalue()
+
+
+def _cooccurrence_delta(orders, dish_index):
+    """
+    Soma X.T @ X, onde X é a matriz de incidência pedido x prato, processando
+    os pedidos em blocos para limitar a memória.
+    """
+    size = len(dish_index)
+    delta = np.zeros((size, size), dtype=np.int64)
+    order_dishes = list(orders.values())
+    for offset in range(0, len(order_dishes), ORDER_CHUNK_SIZE):
+        chunk = order_dishes[offset:offset + ORDER_CHUNK_SIZE]
+        incidence = np.zeros((len(chunk), size), dtype=np.float32)
+        for row, dish_ids in enumerate(chunk):
+            incidence[row, [dish_index[dish_id] for dish_id in dish_ids]] = 1
+        delta += (incidence.T @ incidence).astype(np.int64)
+    return delta
+
+
+def _top_neighbors(matrix, row, top_k):
+    """
+    Os `top_k` vizinhos de `row`, com score = P(vizinho | prato).
+    """
+    counts = matrix[row].copy()
+    counts[row] = 0
+    candidates = np.flatnonzero(counts)
+    if not len(candidates):
+        return []
+    order = candidates[np.argsort(-counts[candidates], kind='stable')][:top_k]
+    total = max(matrix[row, row], 1)
+    return [(int(column), float(counts[column]) / total) for column in order]
+
+
+def _refresh_restaurant(restaurant_id, state, orders, high_water_mark, top_k):
+    old_ids, old_matrix = _load_matrix(state)
+
+    # Descarta pratos removidos e inclui os novos.
+    existing = set(Dish.objects.filter(restaurant_id=restaurant_id).values_list('id', flat=True))
+    new_ids = {dish_id for dish_ids in orders.values() for dish_id in dish_ids}
+    dish_ids = np.array(sorted(existing & (set(old_ids.tolist()) | new_ids)), dtype=np.int64)
+    dish_index = {int(dish_id): position for position, dish_id in enumerate(dish_ids)}
+
+    matrix = np.zeros((len(dish_ids), len(dish_ids)), dtype=np.int64)
+    kept_old = [position for position, dish_id in enumerate(old_ids.tolist()) if dish_id in dish_index]
+    if kept_old:
+        target = [dish_index[int(old_ids[position])] for position in kept_old]
+        matrix[np.ix_(target, target)] = old_matrix[np.ix_(kept_old, kept_old)]
+
+    orders = {
+        order_id: [dish_id for dish_id in ids if dish_id in dish_index]
+        for order_id, ids in orders.items()
+    }
+    delta = _cooccurrence_delta(orders, dish_index)
+    matrix += delta
+
+    # Só as linhas alteradas por pedidos novos precisam de novo top-K.
+    affected = np.flatnonzero(delta.any(axis=1))
+    recommendations = []
+    for row in affected:
+        for rank, (column, score) in enumerate(_top_neighbors(matrix, row, top_k), start=1):
+            recommendations.append(DishRecommendation(
+                dish_id=int(dish_ids[row]), recommended_id=int(dish_ids[column]), rank=rank, score=score,
+            ))
+
+    with transaction.atomic():
+        DishRecommendation.objects.filter(dish_id__in=[int(dish_ids[row]) for row in affected]).delete()
+        DishRecommendation.objects.bulk_create(recommendations)
+        DishCooccurrence.objects.update_or_create(
+            restaurant_id=restaurant_id,
+            defaults={'matrix': _dump_matrix(dish_ids, matrix), 'last_order_id': high_water_mark},
+        )
+    return len(affected)
+
+
+def refresh_recommendations(full=False, top_k=None):
+    """
+    Atualiza as matrizes de co-ocorrência com os pedidos criados desde a
+    última execução (menos os dos últimos RECOMMENDATIONS_SETTLE_SECONDS,
+    que ficam para a próxima) e recalcula o top-K dos pratos afetados.
+
+    Com `full=True`, descarta as matrizes e reprocessa todo o histórico.
+    Retorna o número de pratos cujas recomendações foram recalculadas.
+    """
+    if top_k is None:
+        top_k = getattr(settings, 'RECOMMENDATIONS_TOP_K', 10)
+
+    if full:
+        DishCooccurrence.objects.all().delete()
+        DishRecommendation.objects.all().delete()
+
+    states = {state.restaurant_id: state for state in DishCooccurrence.objects.all()}
+    low_water_mark = min((state.last_order_id for state in states.values()), default=0)
+    # A marca d'água só avança até os pedidos criados há mais de
+    # RECOMMENDATIONS_SETTLE_SECONDS: um pedido com id menor cuja transação
+    # ainda não fez commit seria pulado para sempre nas próximas execuções.
+    settled_before = timezone.now() - timedelta(seconds=getattr(settings, 'RECOMMENDATIONS_SETTLE_SECONDS', 300))
+    high_water_mark = Order.objects.filter(created_at__lte=settled_before).aggregate(last=Max('id'))['last'] or 0
+    if high_water_mark <= low_water_mark:
+        return 0
+
+    items = (
+        OrderItem.objects
+        .filter(order_id__gt=low_water_mark, order_id__lte=high_water_mark, dish__isnull=False)
+        .order_by()
+        .values_list('order_id', 'dish_id', 'dish__restaurant_id')
+    )
+    pending = defaultdict(lambda: defaultdict(set))
+    for order_id, dish_id, restaurant_id in items.iterator(chunk_size=ORDER_CHUNK_SIZE):
+        state = states.get(restaurant_id)
+        if state is not None and order_id <= state.last_order_id:
+            continue
+        pending[restaurant_id][order_id].add(dish_id)
+
+    refreshed = 0
+    for restaurant_id, orders in pending.items():
+        refreshed += _refresh_restaurant(restaurant_id, states.get(restaurant_id), orders, high_water_mark, top_k)
+
+    # Restaurantes sem pedidos novos também avançam a marca d'água.
+    DishCooccurrence.objects.exclude(restaurant_id__in=pending.keys()).update(last_order_id=high_water_mark)
+    return refreshed
@@ -1,11 +1,18 @@
 from rest_framework import serializers
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 import re
 from datetime import datetime
 
-from .models import Restaurant, Dish, Order, OrderItem, Profile, Card
+from .card_bins import detect_card_brand
+from .eta import estimate_preparation_minutes, get_loads
+from .inventory import OutOfStock, place_order
+from .models import (
+    Restaurant, Dish, DishRecommendation, Order, OrderItem, ArchivedOrder, ArchivedOrderItem, Profile, Card,
+    UserOrderStats,
+)
 
 class ChangePasswordSerializer(serializers.Serializer):
     """
@@ -63,12 +70,16 @@ class UserSerializer(serializers.ModelSerializer):
         return value
 
     def create(self, validated_data):
-        user = User.objects.create_user(
-            username=validated_data['email'],
-            email=validated_data['email'],
-            password=validated_data['password'],
-            first_name=validated_data.get('first_name', '')
+        # Mesmo que User.objects.create_user. O RegisterView calcula o hash no
+        # pool de hashing e o passa em save(encoded_password=...).
+        encoded_password = validated_data.get('encoded_password') or make_password(validated_data['password'])
+        user = User(
+            username=User.normalize_username(validated_data['email']),
+            email=User.objects.normalize_email(validated_data['email']),
+            first_name=validated_data.get('first_name', ''),
+            password=encoded_password,
         )
+        user.save()
         return user
 
     def update(self, instance, validated_data):
@@ -82,16 +93,33 @@ class UserSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
+class UserOrderStatsSerializer(serializers.ModelSerializer):
+    favorite_restaurant_name = serializers.CharField(source='favorite_restaurant.name', read_only=True, default=None)
+
+    class Meta:
+        model = UserOrderStats
+        fields = [
+            'order_count', 'completed_count', 'total_spent', 'favorite_restaurant',
+            'favorite_restaurant_name', 'last_order_at',
+        ]
+
 class ProfileSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(source='user.email', read_only=True)
     name = serializers.CharField(source='user.first_name', read_only=True)
     username = serializers.CharField(source='user.username', read_only=True)
+    order_stats = serializers.SerializerMethodField()
 
     class Meta:
         model = Profile
-        fields = ['id', 'user', 'role', 'phone_number', 'address', 'email', 'name', 'username']
+        fields = ['id', 'user', 'role', 'phone_number', 'address', 'email', 'name', 'username', 'order_stats']
         read_only_fields = ['user', 'role']
 
+    def get_order_stats(self, obj):
+        # Lido da linha pré-calculada (select_related na view); quem ainda não
+        # fez pedidos recebe os valores zerados.
+        stats = getattr(obj.user, 'order_stats', None) or UserOrderStats(user=obj.user)
+        return UserOrderStatsSerializer(stats).data
+
 
 # ===================================================================
 # SERIALIZERS DE RESTAURANTE E PRATOS
@@ -100,13 +128,54 @@ class ProfileSerializer(serializers.ModelSerializer):
 class DishSerializer(serializers.ModelSerializer):
     class Meta:
         model = Dish
-        fields = ['id', 'name', 'description', 'price', 'restaurant', 'category', 'image']
+        fields = ['id', 'name', 'description', 'price', 'restaurant', 'category', 'image', 'stock']
+
+class DishRecommendationSerializer(serializers.ModelSerializer):
+    dish = DishSerializer(source='recommended', read_only=True)
+
+    class Meta:
+        model = DishRecommendation
+        fields = ['score', 'dish']
+
+class RestaurantListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Carrega a carga de todos os restaurantes da página num único get_many.
+        restaurants = list(data.all() if hasattr(data, 'all') else data)
+        self.context.setdefault('restaurant_loads', get_loads([restaurant.id for restaurant in restaurants]))
+        return super().to_representation(restaurants)
 
 class RestaurantSerializer(serializers.ModelSerializer):
     dishes = DishSerializer(many=True, read_only=True)
+    estimated_delivery_time = serializers.SerializerMethodField()
+
     class Meta:
         model = Restaurant
-        fields = ['id', 'name', 'description', 'address', 'delivery_time', 'image', 'dishes']
+        fields = [
+            'id', 'name', 'description', 'address', 'delivery_time', 'estimated_delivery_time', 'image',
+            'latitude', 'longitude', 'delivery_radius_km', 'dishes',
+        ]
+        list_serializer_class = RestaurantListSerializer
+
+    def get_estimated_delivery_time(self, obj):
+        loads = self.context.get('restaurant_loads')
+        if loads is None or obj.id not in loads:
+            loads = get_loads([obj.id])
+        return estimate_preparation_minutes(obj.delivery_time, loads[obj.id])
+
+class NearbyRestaurantSerializer(serializers.ModelSerializer):
+    """
+    Restaurante na busca por proximidade, sem o cardápio e com a distância
+    e a estimativa de entrega calculadas para o ponto consultado.
+    """
+    distance_km = serializers.FloatField(read_only=True)
+    estimated_delivery_time = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Restaurant
+        fields = [
+            'id', 'name', 'description', 'address', 'delivery_time', 'image',
+            'latitude', 'longitude', 'delivery_radius_km', 'distance_km', 'estimated_delivery_time',
+        ]
 
 # ===================================================================
 # SERIALIZER DE CARTÃO (COM VALIDAÇÕES COMPLETAS)
@@ -115,8 +184,17 @@ class RestaurantSerializer(serializers.ModelSerializer):
 class CardSerializer(serializers.ModelSerializer):
     class Meta:
         model = Card
-        fields = ['id', 'user', 'card_number', 'card_holder_name', 'expiry_date', 'cvv', 'card_brand', 'created_at']
-        read_only_fields = ['id', 'user', 'created_at', 'card_brand']
+        fields = ['id', 'user', 'card_number', 'card_holder_name', 'expiry_date', 'cvv', 'card_brand', 'card_type', 'created_at']
+        read_only_fields = ['id', 'user', 'created_at', 'card_brand', 'card_type']
+
+    def validate(self, data):
+        # Bandeira e tipo são derivados do BIN (primeiros dígitos do número).
+        card_number = data.get('card_number')
+        if card_number:
+            match = detect_card_brand(card_number)
+            data['card_brand'] = match.brand if match else None
+            data['card_type'] = match.card_type if match else None
+        return data
 
     def validate_expiry_date(self, value):
         if not re.match(r'^(0[1-9]|1[0-2])\/\d{2}$', value):
@@ -155,12 +233,13 @@ class CardSerializer(serializers.ModelSerializer):
 # ===================================================================
 
 class OrderItemSerializer(serializers.ModelSerializer):
-    dish_name = serializers.CharField(source='dish.name', read_only=True)
-    dish_price = serializers.DecimalField(source='dish.price', max_digits=6, decimal_places=2, read_only=True)
-    
+    # dish_name é o nome salvo no pedido; o prato pode ter sido removido depois.
+    dish_price = serializers.DecimalField(source='dish.price', max_digits=6, decimal_places=2, read_only=True, allow_null=True)
+
     class Meta:
         model = OrderItem
         fields = ['id', 'dish', 'quantity', 'price', 'dish_name', 'dish_price']
+        read_only_fields = ['dish_name']
 
 class OrderItemCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -174,28 +253,50 @@ class OrderSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Order
-        fields = ['id', 'user', 'status', 'created_at', 'total', 'payment_method', 'items', 'order_items']
-        read_only_fields = ['id', 'user', 'status', 'created_at', 'total', 'order_items']
+        fields = ['id', 'user', 'restaurant', 'status', 'created_at', 'total', 'payment_method', 'items', 'order_items']
+        read_only_fields = ['id', 'user', 'restaurant', 'status', 'created_at', 'total', 'order_items']
+
+    def validate_items(self, value):
+        if len({item['dish'].restaurant_id for item in value}) > 1:
+            raise serializers.ValidationError("Todos os itens do pedido devem ser do mesmo restaurante.")
+        return value
 
     def create(self, validated_data):
         items_data = validated_data.pop('items', [])
         payment_method = validated_data.pop('payment_method', 'card')
 
         validated_data['user'] = self.context['request'].user
-        order = Order.objects.create(**validated_data)
-        
-        total_price = 0
-        for item_data in items_data:
-            dish = item_data['dish']
-            quantity = item_data['quantity']
-            price = dish.price
-            OrderItem.objects.create(order=order, dish=dish, quantity=quantity, price=price)
-            total_price += price * quantity
-        
-        order.total = total_price
-        order.payment_method = payment_method
-        order.save()
-        return order
+        validated_data['restaurant_id'] = items_data[0]['dish'].restaurant_id if items_data else None
+
+        items = [
+            OrderItem(dish=item['dish'], dish_name=item['dish'].name, quantity=item['quantity'], price=item['dish'].price)
+            for item in items_data
+        ]
+        tracked_dish_ids = {item['dish'].id for item in items_data if item['dish'].stock is not None}
+        try:
+            return place_order(items, tracked_dish_ids, payment_method=payment_method, **validated_data)
+        except OutOfStock as exc:
+            raise serializers.ValidationError({'items': [str(exc)]})
+
+class ArchivedOrderItemSerializer(serializers.ModelSerializer):
+    # O prato pode ter sido removido depois do arquivamento.
+    dish_price = serializers.DecimalField(source='dish.price', max_digits=6, decimal_places=2, read_only=True, allow_null=True)
+
+    class Meta:
+        model = ArchivedOrderItem
+        fields = ['id', 'dish', 'quantity', 'price', 'dish_name', 'dish_price']
+        read_only_fields = fields
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    """
+    Mesma representação de leitura do OrderSerializer, para pedidos arquivados.
+    """
+    order_items = ArchivedOrderItemSerializer(source='items', many=True, read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = ['id', 'user', 'restaurant', 'status', 'created_at', 'total', 'order_items']
+        read_only_fields = fields
 
 class ChangePasswordSerializer(serializers.Serializer):
     old_password = serializers.CharField(required=True)
@@ -0,0 +1,89 @@
+# app/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import eta, order_stats
+from .menus import schedule_menu_rebuild
+from .models import Dish, Order, Restaurant
+from .pubsub import get_broker, user_orders_channel
+
+
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    # Guarda o status carregado para detectar mudanças no post_save.
+    instance._loaded_status = instance.status
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    # Um único receiver calcula o status anterior e repassa para cada
+    # consumidor, em vez de cada um manter o seu próprio snapshot.
+    previous_status = None if created else instance._loaded_status
+    instance._loaded_status = instance.status
+
+    update_user_order_stats(instance, created, previous_status)
+    update_restaurant_load(instance, created, previous_status)
+    publish_order_status(instance, previous_status)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    if instance.restaurant_id is not None and instance._loaded_status == 'P':
+        restaurant_id = instance.restaurant_id
+        transaction.on_commit(lambda: eta.record_pending_removed(restaurant_id))
+
+
+def publish_order_status(instance, previous_status):
+    if instance.user_id is None or previous_status == instance.status:
+        return
+
+    message = {
+        'id': instance.id,
+        'status': instance.status,
+        'previous_status': previous_status,
+    }
+    channel = user_orders_channel(instance.user_id)
+    # Só publica depois do commit, para o cliente nunca ver um pedido revertido.
+    transaction.on_commit(lambda: get_broker().publish(channel, message))
+
+
+def update_restaurant_load(instance, created, previous_status):
+    # Contadores de carga do app/eta.py, atualizados só depois do commit
+    # para não contar pedidos revertidos.
+    restaurant_id = instance.restaurant_id
+    if restaurant_id is None:
+        return
+    if created:
+        pending = instance.status == 'P'
+        transaction.on_commit(lambda: eta.record_order_created(restaurant_id, pending))
+    elif previous_status == 'P' and instance.status == 'C':
+        transaction.on_commit(lambda: eta.record_order_completed(restaurant_id))
+
+
+def update_user_order_stats(instance, created, previous_status):
+    # Síncrono, dentro da transação do pedido: as estatísticas só mudam se o
+    # pedido for de fato gravado.
+    if instance.user_id is None:
+        return
+    if created:
+        order_stats.record_order_created(instance)
+    if instance.status == 'C' and previous_status != 'C':
+        order_stats.record_order_completed(instance)
+    elif previous_status == 'C' and instance.status != 'C':
+        order_stats.record_order_reopened(instance)
+
+
+@receiver(post_save, sender=Dish)
+@receiver(post_delete, sender=Dish)
+def rebuild_menu_on_dish_change(sender, instance, **kwargs):
+    restaurant_id = instance.restaurant_id
+    transaction.on_commit(lambda: schedule_menu_rebuild(restaurant_id))
+
+
+@receiver(post_save, sender=Restaurant)
+def rebuild_menu_on_restaurant_change(sender, instance, **kwargs):
+    # O documento também leva nome, descrição e imagem do restaurante.
+    restaurant_id = instance.id
+    transaction.on_commit(lambda: schedule_menu_rebuild(restaurant_id))
@@ -1,3 +1,558 @@
-from django.test import TestCase
+import random
+import threading
+import time
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .archive import archive_orders
+from .card_bins import BinMatch, BinTable
+from .eta import reseed_pending
+from .geo import LocalGeocoder, encode_geohash, haversine_km, nearby_restaurants, neighbor_prefixes
+from .recommendations import refresh_recommendations
+from .hashing import HashPool
+from .inventory import OutOfStock, reserve_stock
+from .models import (
+    ArchivedOrder, Dish, DishCooccurrence, DishRecommendation, Order, OrderItem, Profile, Restaurant, UserOrderStats,
+)
+from .serializers import (
+    ArchivedOrderSerializer, OrderSerializer, RestaurantSerializer, UserAndProfileSerializer,
+)
+
+
+class FastJSONReadPathTests(TestCase):
+    """
+    O caminho rápido das listagens (app/fast_json.py) precisa gerar exatamente
+    os mesmos bytes que os serializers renderizados pelo JSONRenderer.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin@foody.com', 'admin@foody.com', 'senha-forte-123')
+        cls.user = User.objects.create_user('joão@foody.com', 'joão@foody.com', 'senha-forte-123', first_name='João')
+        Profile.objects.create(user=cls.user, phone_number='11999999999', address='Rua São Bento, 10')
+
+        cls.restaurant = Restaurant.objects.create(
+            name='Cantina Ñandú', description='Massas caseiras', address='Centro',
+            latitude=-23.5505, longitude=-46.6333, image='https://example.com/a.png',
+        )
+        Restaurant.objects.create(name='Sem pratos', description='')
+        cls.pasta = Dish.objects.create(
+            name='Lasanha', description='À bolonhesa', price=Decimal('39.9'), restaurant=cls.restaurant, stock=4,
+        )
+        cls.salad = Dish.objects.create(
+            name='Salada', description='', price=Decimal('12.00'), restaurant=cls.restaurant, category='Entradas',
+        )
+
+        for index, status in enumerate(['C', 'C', 'P']):
+            order = Order.objects.create(
+                user=cls.user, restaurant=cls.restaurant, status=status, total=Decimal('64.80'),
+            )
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=400 - index))
+            OrderItem.objects.create(order=order, dish=cls.pasta, quantity=1, price=Decimal('39.90'))
+            OrderItem.objects.create(order=order, dish=cls.salad, quantity=2, price=Decimal('12.45'))
+        archive_orders(older_than_days=365, batch_size=1)
+        cls.salad.delete()
+
+    def setUp(self):
+        # Os contadores de carga vivem no cache, que não é desfeito entre os
+        # testes: começa do zero e semeia a fila explicitamente.
+        cache.clear()
+        reseed_pending(Restaurant.objects.values_list('pk', flat=True))
+
+    def get(self, path, user):
+        token = RefreshToken.for_user(user).access_token
+        return self.client.get(path, HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def assertRendersLike(self, response, data):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.content, JSONRenderer().render(data))
+
+    def test_restaurant_list_matches_serializer(self):
+        restaurants = Restaurant.objects.order_by('id')
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/restaurants/')
+        self.assertRendersLike(response, RestaurantSerializer(restaurants, many=True).data)
+
+    def test_order_list_matches_serializers(self):
+        hot = Order.objects.filter(user=self.user).order_by('-created_at')
+        archived = ArchivedOrder.objects.filter(user=self.user).order_by('-created_at')
+        self.assertEqual((hot.count(), archived.count()), (1, 2))
+
+        response = self.get('/api/orders/', self.user)
+        expected = (
+            OrderSerializer(hot, many=True).data
+            + ArchivedOrderSerializer(archived, many=True).data
+        )
+        self.assertRendersLike(response, expected)
+
+    def test_user_list_matches_serializer(self):
+        users = User.objects.order_by('id')
+        response = self.get('/api/users/', self.admin)
+        self.assertRendersLike(response, UserAndProfileSerializer(users, many=True).data)
+
+    def test_browsable_api_uses_serializers(self):
+        response = self.client.get('/api/restaurants/', HTTP_ACCEPT='text/html')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('text/html', response['Content-Type'])
+
+
+class StockReservationTests(TestCase):
+    """
+    Baixa de estoque com UPDATE condicional (app/inventory.py) e o rollback do
+    pedido quando falta estoque.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('maria@foody.com', 'maria@foody.com', 'senha-forte-123')
+        cls.restaurant = Restaurant.objects.create(name='Pizzaria', description='')
+        cls.pizza = Dish.objects.create(name='Pizza', description='', price=Decimal('50.00'), restaurant=cls.restaurant, stock=3)
+        cls.soda = Dish.objects.create(name='Refrigerante', description='', price=Decimal('6.00'), restaurant=cls.restaurant)
+
+    def post_order(self, items):
+        token = RefreshToken.for_user(self.user).access_token
+        return self.client.post(
+            '/api/orders/', {'items': items}, content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {token}',
+        )
+
+    def stock(self, dish):
+        return Dish.objects.values_list('stock', flat=True).get(pk=dish.pk)
+
+    def test_decrements_tracked_dishes_only(self):
+        with transaction.atomic():
+            reserve_stock({self.pizza.id: 2, self.soda.id: 100})
+        self.assertEqual(self.stock(self.pizza), 1)
+        self.assertIsNone(self.stock(self.soda))
+
+    def test_never_goes_negative(self):
+        with transaction.atomic():
+            reserve_stock({self.pizza.id: 3})
+        with self.assertRaises(OutOfStock) as raised, transaction.atomic():
+            reserve_stock({self.pizza.id: 1})
+        self.assertEqual(raised.exception.dish_ids, [self.pizza.id])
+        self.assertEqual(self.stock(self.pizza), 0)
+
+    def test_condition_uses_current_row_not_loaded_value(self):
+        # Outro checkout baixa o estoque depois que o prato foi carregado.
+        stale = Dish.objects.get(pk=self.pizza.pk)
+        Dish.objects.filter(pk=self.pizza.pk).update(stock=1)
+        self.assertEqual(stale.stock, 3)
+        with self.assertRaises(OutOfStock), transaction.atomic():
+            reserve_stock({stale.id: 2})
+        self.assertEqual(self.stock(self.pizza), 1)
+
+    def test_order_creates_items_and_decrements(self):
+        response = self.post_order([{'dish': self.pizza.id, 'quantity': 2}, {'dish': self.soda.id, 'quantity': 1}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['total'], '106.00')
+        self.assertEqual(self.stock(self.pizza), 1)
+
+    def test_repeated_lines_are_summed(self):
+        # 2 + 2 passa de 3, mesmo que cada linha sozinha caiba no estoque.
+        response = self.post_order([{'dish': self.pizza.id, 'quantity': 2}, {'dish': self.pizza.id, 'quantity': 2}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stock(self.pizza), 3)
+
+    def test_out_of_stock_rolls_back_order_and_items(self):
+        response = self.post_order([{'dish': self.soda.id, 'quantity': 1}, {'dish': self.pizza.id, 'quantity': 4}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'items': ['Estoque insuficiente para: Pizza.']})
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+        self.assertEqual(self.stock(self.pizza), 3)
+
+    def test_reorder_reports_out_of_stock_like_checkout(self):
+        response = self.post_order([{'dish': self.pizza.id, 'quantity': 2}])
+        self.assertEqual(response.status_code, 201)
+        token = RefreshToken.for_user(self.user).access_token
+        response = self.client.post(
+            f'/api/orders/{response.json()["id"]}/reorder/', HTTP_AUTHORIZATION=f'Bearer {token}',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'items': ['Estoque insuficiente para: Pizza.']})
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(self.stock(self.pizza), 1)
+
+
+class OrderArchiveTests(TestCase):
+    """
+    Arquivamento de pedidos antigos (app/archive.py) e a leitura transparente
+    do histórico, que cai para o arquivo.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('bia@foody.com', 'bia@foody.com', 'senha-forte-123')
+        cls.other = User.objects.create_user('rui@foody.com', 'rui@foody.com', 'senha-forte-123')
+        cls.restaurant = Restaurant.objects.create(name='Cantina', description='')
+        cls.dish = Dish.objects.create(name='Nhoque', description='', price=Decimal('30.00'), restaurant=cls.restaurant)
+
+        # Quatro pedidos antigos e completos (arquiváveis), um antigo ainda
+        # pendente e dois recentes.
+        cls.orders = []
+        for days, status in [(400, 'C'), (399, 'C'), (398, 'C'), (397, 'C'), (396, 'P'), (2, 'C'), (1, 'P')]:
+            order = Order.objects.create(user=cls.user, restaurant=cls.restaurant, status=status, total=Decimal('30.00'))
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days))
+            OrderItem.objects.create(order=order, dish=cls.dish, quantity=days, price=Decimal('30.00'))
+            cls.orders.append(order)
+
+    def get(self, path, user=None):
+        token = RefreshToken.for_user(user or self.user).access_token
+        return self.client.get(path, HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_order_items_fall_back_to_archive(self):
+        archive_orders(older_than_days=365)
+        archived, hot = self.orders[0], self.orders[5]
+
+        response = self.get(f'/api/orders/{archived.pk}/items/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['quantity'] for item in response.json()], [400])
+
+        response = self.get(f'/api/orders/{hot.pk}/items/')
+        self.assertEqual([item['quantity'] for item in response.json()], [2])
+
+        item_id = ArchivedOrder.objects.get(pk=archived.pk).items.get().pk
+        response = self.get(f'/api/orders/{archived.pk}/items/{item_id}/')
+        self.assertEqual((response.status_code, response.json()['quantity']), (200, 400))
+
+    def test_archive_moves_old_completed_orders_in_batches(self):
+        self.assertEqual(archive_orders(older_than_days=365, batch_size=3, max_batches=1), 3)
+        self.assertEqual(ArchivedOrder.objects.count(), 3)
+        self.assertEqual(archive_orders(older_than_days=365, batch_size=3), 1)
+        self.assertEqual(archive_orders(older_than_days=365, batch_size=3), 0)
+
+        # Só os completos antigos saem; os itens mantêm ids e conteúdo.
+        archived_ids = [order.pk for order in self.orders[:4]]
+        self.assertEqual(sorted(ArchivedOrder.objects.values_list('pk', flat=True)), archived_ids)
+        self.assertEqual(sorted(Order.objects.values_list('pk', flat=True)), [order.pk for order in self.orders[4:]])
+        self.assertFalse(OrderItem.objects.filter(order_id__in=archived_ids).exists())
+        self.assertEqual(
+            sorted(ArchivedOrder.objects.values_list('items__quantity', flat=True)), [397, 398, 399, 400],
+        )
+
+    def test_history_pages_across_hot_and_archive(self):
+        archive_orders(older_than_days=365)
+        newest_first = [order.pk for order in reversed(self.orders)]
+
+        pages = []
+        path = '/api/orders/?limit=2'
+        while path:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.get(path)
+            body = response.json()
+            pages.append(([order['id'] for order in body['results']], queries))
+            path = body['next']
+        self.assertEqual([ids for ids, _ in pages], [newest_first[i:i + 2] for i in range(0, 7, 2)])
+
+        # A primeira página cabe nos pedidos quentes: o arquivo não é lido.
+        first_page_sql = ' '.join(query['sql'] for query in pages[0][1].captured_queries)
+        self.assertNotIn(ArchivedOrder._meta.db_table, first_page_sql)
+
+    def test_order_items_are_scoped_to_the_owner(self):
+        archive_orders(older_than_days=365)
+        for order in (self.orders[0], self.orders[5]):
+            response = self.get(f'/api/orders/{order.pk}/items/', self.other)
+            self.assertEqual(response.json(), [])
+        self.assertEqual(self.get('/api/orders/abc/items/').status_code, 404)
+
+
+class RestaurantLocationTests(TestCase):
+    """
+    Geocodificação dos restaurantes e busca por proximidade (app/geo.py).
+    """
+
+    def setUp(self):
+        geocoder = LocalGeocoder({
+            'Av. Paulista, 1000': (-23.5650, -46.6520),
+            'Rua Augusta, 500': (-23.5530, -46.6590),
+        })
+        patcher = mock.patch('app.models.get_geocoder', return_value=geocoder)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_address_change_regeocodes(self):
+        restaurant = Restaurant.objects.create(name='Padaria', description='', address='Av. Paulista, 1000')
+        self.assertEqual((restaurant.latitude, restaurant.longitude), (-23.5650, -46.6520))
+
+        restaurant = Restaurant.objects.get(pk=restaurant.pk)
+        restaurant.address = 'Rua Augusta, 500'
+        restaurant.save(update_fields=['address'])
+        restaurant = Restaurant.objects.get(pk=restaurant.pk)
+        self.assertEqual((restaurant.latitude, restaurant.longitude), (-23.5530, -46.6590))
+        self.assertEqual(restaurant.geohash, encode_geohash(-23.5530, -46.6590))
+
+        # Endereço desconhecido: as coordenadas antigas não valem mais.
+        restaurant.address = 'Rua Inexistente, 1'
+        restaurant.save()
+        restaurant = Restaurant.objects.get(pk=restaurant.pk)
+        self.assertEqual((restaurant.latitude, restaurant.longitude, restaurant.geohash), (None, None, ''))
+
+    def test_explicit_coordinates_win_over_address(self):
+        restaurant = Restaurant.objects.create(name='Padaria', description='', address='Av. Paulista, 1000')
+        restaurant = Restaurant.objects.get(pk=restaurant.pk)
+        restaurant.address = 'Rua Augusta, 500'
+        restaurant.latitude, restaurant.longitude = -23.5600, -46.6400
+        restaurant.save()
+        restaurant = Restaurant.objects.get(pk=restaurant.pk)
+        self.assertEqual((restaurant.latitude, restaurant.longitude), (-23.5600, -46.6400))
+
+    def test_geohash_and_neighbors(self):
+        self.assertEqual(encode_geohash(57.64911, 10.40744), 'u4pruydqq')
+        prefixes = neighbor_prefixes(-23.5505, -46.6333, 5)
+        self.assertEqual(len(prefixes), 9)
+        self.assertIn(encode_geohash(-23.5505, -46.6333, 5), prefixes)
+        # Perto do antimeridiano, as vizinhas do outro lado também entram.
+        self.assertIn(encode_geohash(0.0, -179.99, 4), neighbor_prefixes(0.0, 179.99, 4))
+
+    def test_nearby_matches_brute_force(self):
+        rng = random.Random(42)
+        for index in range(40):
+            Restaurant.objects.create(
+                name=f'R{index}', description='',
+                latitude=-23.55 + rng.uniform(-0.25, 0.25), longitude=-46.63 + rng.uniform(-0.25, 0.25),
+                delivery_radius_km=rng.choice([2, 5, 10, 15, 30]),
+            )
+        restaurants = list(Restaurant.objects.all())
+
+        for _ in range(15):
+            lat, lng = -23.55 + rng.uniform(-0.2, 0.2), -46.63 + rng.uniform(-0.2, 0.2)
+            expected = {
+                r.pk for r in restaurants
+                if haversine_km(lat, lng, r.latitude, r.longitude) <= min(r.delivery_radius_km, 15)
+            }
+            found = nearby_restaurants(Restaurant.objects.all(), lat, lng)
+            self.assertEqual({r.pk for r in found}, expected)
+            distances = [r.distance_km for r in found]
+            self.assertEqual(distances, sorted(distances))
+
+
+class UserOrderStatsTests(TestCase):
+    """
+    Estatísticas de pedidos por usuário mantidas pelos signals de Order
+    (app/order_stats.py).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('lia@foody.com', 'lia@foody.com', 'senha-forte-123')
+        cls.restaurant = Restaurant.objects.create(name='Cantina', description='')
+
+    def stats(self):
+        return UserOrderStats.objects.values_list('order_count', 'completed_count', 'total_spent').get(user=self.user)
+
+    def test_status_transitions_are_symmetric(self):
+        order = Order.objects.create(user=self.user, restaurant=self.restaurant, status='P', total=Decimal('42.50'))
+        self.assertEqual(self.stats(), (1, 0, Decimal('0.00')))
+
+        order.status = 'C'
+        order.save()
+        order.save()
+        self.assertEqual(self.stats(), (1, 1, Decimal('42.50')))
+
+        order.status = 'P'
+        order.save()
+        self.assertEqual(self.stats(), (1, 0, Decimal('0.00')))
+
+        order = Order.objects.get(pk=order.pk)
+        order.status = 'C'
+        order.save()
+        self.assertEqual(self.stats(), (1, 1, Decimal('42.50')))
+
+
+class BinTableTests(TestCase):
+    """
+    Resolução de faixas de BIN sobrepostas (app/card_bins.py): vence a faixa
+    mais estreita que cobre o número.
+    """
+
+    def test_most_specific_range_wins(self):
+        table = BinTable([
+            ('4', '4', 'visa', 'credit'),
+            ('4111', '4111', 'visa', 'debit'),
+            ('411111', '411111', 'visa', 'prepaid'),
+            ('51', '55', 'mastercard', 'credit'),
+            ('5300', '5399', 'maestro', ''),
+        ])
+        self.assertEqual(table.lookup('4000000000000002'), BinMatch('visa', 'credit'))
+        self.assertEqual(table.lookup('4111000000000000'), BinMatch('visa', 'debit'))
+        self.assertEqual(table.lookup('4111110000000000'), BinMatch('visa', 'prepaid'))
+        self.assertEqual(table.lookup('4111120000000000'), BinMatch('visa', 'debit'))
+        self.assertEqual(table.lookup('4112000000000000'), BinMatch('visa', 'credit'))
+        self.assertEqual(table.lookup('5200000000000000'), BinMatch('mastercard', 'credit'))
+        self.assertEqual(table.lookup('5355000000000000'), BinMatch('maestro', None))
+        self.assertEqual(table.lookup('5400000000000000'), BinMatch('mastercard', 'credit'))
+        self.assertIsNone(table.lookup('5600000000000000'))
+        self.assertIsNone(table.lookup('3000000000000000'))
+        self.assertIsNone(table.lookup('41x1'))
+
+    def test_contiguous_ranges_with_same_label_are_merged(self):
+        table = BinTable([('40', '40', 'visa', 'credit'), ('41', '42', 'visa', 'credit'), ('43', '43', 'elo', 'debit')])
+        self.assertEqual(len(table), 2)
+
+    def test_matches_brute_force_on_random_ranges(self):
+        rng = random.Random(1234)
+        labels = [('visa', 'credit'), ('mastercard', 'debit'), ('elo', ''), ('amex', 'credit')]
+        spans = {}
+        while len(spans) < 60:
+            length = rng.randint(1, 4)
+            start = rng.randint(10 ** (length - 1), 10 ** length - 1)
+            end = rng.randint(start, min(start + rng.randint(0, 30), 10 ** length - 1))
+            # Uma bandeira por intervalo de chaves ('7'-'7' e '70'-'79' são o
+            # mesmo): o mesmo intervalo com duas bandeiras não tem resposta certa.
+            spans.setdefault((str(start).ljust(8, '0'), str(end).ljust(8, '9')), (str(start), str(end)))
+        ranges = [(start, end, *rng.choice(labels)) for start, end in spans.values()]
+        table = BinTable(ranges)
+
+        def expected(key):
+            covering = []
+            for start, end, brand, card_type in ranges:
+                low, high = int(start.ljust(8, '0')), int(end.ljust(8, '9'))
+                if low <= key <= high:
+                    covering.append((high - low, low, high, BinMatch(brand, card_type or None)))
+            # Empates de largura: a faixa que começa antes (ordem da carga).
+            return min(covering, key=lambda entry: entry[:3])[3] if covering else None
+
+        for _ in range(2000):
+            key = rng.randint(10 ** 7, 10 ** 8 - 1)
+            self.assertEqual(table.lookup(str(key)), expected(key), key)
+
+
+class RecommendationRefreshTests(TestCase):
+    """
+    Atualização incremental da co-ocorrência (app/recommendations.py): o
+    resultado precisa bater com o reprocessamento completo do histórico.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ivo@foody.com', 'ivo@foody.com', 'senha-forte-123')
+        cls.restaurant = Restaurant.objects.create(name='Cantina', description='')
+        cls.dishes = {
+            name: Dish.objects.create(name=name, description='', price=Decimal('10.00'), restaurant=cls.restaurant)
+            for name in ['pizza', 'suco', 'salada', 'pudim']
+        }
+
+    def order(self, *names, age=timedelta(hours=1)):
+        order = Order.objects.create(user=self.user, restaurant=self.restaurant, status='C', total=Decimal('10.00'))
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - age)
+        for name in names:
+            OrderItem.objects.create(order=order, dish=self.dishes[name], quantity=1, price=Decimal('10.00'))
+        return order
+
+    def recommendations(self):
+        names = {dish.pk: name for name, dish in self.dishes.items()}
+        return {
+            (names[dish_id], rank): (names[recommended_id], round(score, 6))
+            for dish_id, recommended_id, rank, score in DishRecommendation.objects.values_list(
+                'dish_id', 'recommended_id', 'rank', 'score',
+            )
+        }
+
+    def test_scores_are_conditional_probabilities(self):
+        self.order('pizza', 'suco')
+        self.order('pizza', 'suco')
+        self.order('pizza', 'salada')
+        self.order('pizza')
+        refresh_recommendations(top_k=2)
+        recommendations = self.recommendations()
+        self.assertEqual(recommendations['pizza', 1], ('suco', 0.5))
+        self.assertEqual(recommendations['pizza', 2], ('salada', 0.25))
+        self.assertEqual(recommendations['suco', 1], ('pizza', 1.0))
+
+    def test_incremental_matches_full_rebuild(self):
+        self.order('pizza', 'suco')
+        self.order('salada', 'pudim')
+        refresh_recommendations(top_k=3)
+
+        self.order('pizza', 'suco', 'pudim')
+        self.order('suco', 'salada')
+        fresh = self.order('pizza', 'salada', age=timedelta(0))
+        refresh_recommendations(top_k=3)
+        # O pedido recente ainda pode ter vizinhos sem commit: fica para depois.
+        self.assertLess(DishCooccurrence.objects.get().last_order_id, fresh.pk)
+        self.assertNotIn('salada', [name for (dish, _), (name, _) in self.recommendations().items() if dish == 'pizza'])
+
+        Order.objects.filter(pk=fresh.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        self.dishes.pop('pudim').delete()
+        refresh_recommendations(top_k=3)
+        incremental = self.recommendations()
+
+        refresh_recommendations(full=True, top_k=3)
+        self.assertEqual(incremental, self.recommendations())
+        self.assertEqual(DishCooccurrence.objects.get().last_order_id, fresh.pk)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Precisa de escritas concorrentes de verdade (PostgreSQL).')
+class ConcurrentCheckoutTests(TransactionTestCase):
+    # Cada thread abre sua conexão: fica abaixo do max_connections padrão (100).
+    CHECKOUTS = 80
+    STOCK = 30
+
+    def test_concurrent_checkouts_never_oversell(self):
+        restaurant = Restaurant.objects.create(name='Pizzaria', description='')
+        dish = Dish.objects.create(name='Pizza', description='', price=Decimal('50.00'), restaurant=restaurant, stock=self.STOCK)
+        results = []
+        barrier = threading.Barrier(self.CHECKOUTS)
+
+        def checkout():
+            barrier.wait()
+            try:
+                with transaction.atomic():
+                    reserve_stock({dish.id: 1})
+                results.append(True)
+            except OutOfStock:
+                results.append(False)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=checkout) for _ in range(self.CHECKOUTS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(True), self.STOCK)
+        self.assertEqual(Dish.objects.get(pk=dish.pk).stock, 0)
+
+
+class HashPoolBackpressureTests(TestCase):
+    """
+    Com o pool de hashing cheio, o login é recusado na hora com 503, sem
+    esperar na fila.
+    """
+
+    def setUp(self):
+        self.pool = HashPool(workers=1, queue_limit=0, timeout=10)
+        patcher = mock.patch('app.hashing.get_hash_pool', return_value=self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        if self.pool._executor is not None:
+            self.pool._executor.shutdown(wait=True, cancel_futures=True)
+
+    def test_saturated_pool_returns_503(self):
+        User.objects.create_user('ana@foody.com', 'ana@foody.com', 'senha-forte-123')
+        # Ocupa a única vaga do pool (workers + queue_limit).
+        self.pool.submit(time.sleep, 1)
+
+        started = time.monotonic()
+        response = self.client.post(
+            '/api/login/', {'email': 'ana@foody.com', 'password': 'senha-forte-123'}, content_type='application/json',
+        )
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(self.pool.stats()['rejected'], 1)
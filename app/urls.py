@@ -5,10 +5,11 @@ from rest_framework_nested import routers
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 from .views import (
-    RestaurantViewSet, DishViewSet, OrderViewSet, OrderItemViewSet,
+    RestaurantViewSet, DishViewSet, OrderViewSet, OrderItemViewSet, OrderStatusStreamView,
     RegisterView, LoginView, UserProfileView,
     CardListCreateView, CardDetailView,
-    VerifyEmailView, ChangePasswordView, UserViewSet,
+    VerifyEmailView, ChangePasswordView, UserViewSet, BatchView, HashPoolMetricsView,
+    SlowQueryLogView,
 )
 
 # Cria o router principal para os endpoints principais
@@ -26,6 +27,10 @@ orders_router.register(r'items', OrderItemViewSet, basename='order-items')
 
 # Define a lista final de URLs da API
 urlpatterns = [
+    # Stream de status dos pedidos (SSE). Precisa vir antes do router de
+    # pedidos, senão 'stream' seria interpretado como o id de um pedido.
+    path('orders/stream/', OrderStatusStreamView.as_view(), name='order_stream'),
+
     # Inclui as rotas geradas pelos routers
     path('', include(router.urls)),
     path('', include(restaurants_router.urls)),
@@ -42,6 +47,13 @@ urlpatterns = [
     path('change-password/', ChangePasswordView.as_view(), name='change_password'),
     path('verify-email/', VerifyEmailView.as_view(), name='verify-email'),
 
+    # Métricas internas (staff)
+    path('metrics/hash-pool/', HashPoolMetricsView.as_view(), name='hash_pool_metrics'),
+    path('debug/slow-queries/', SlowQueryLogView.as_view(), name='slow_queries'),
+
+    # Várias requisições de leitura numa única chamada
+    path('batch/', BatchView.as_view(), name='batch'),
+
     # Rotas para Cartões
     path('cards/', CardListCreateView.as_view(), name='card_list_create'),
     path('cards/<int:pk>/', CardDetailView.as_view(), name='card_detail'),
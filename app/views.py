@@ -1,23 +1,49 @@
+import json
 import random
 from datetime import timedelta
+from asgiref.sync import sync_to_async
 from django.utils import timezone
+from django.utils.cache import patch_vary_headers
 from django.core.mail import send_mail
 from django.conf import settings
-
-from django.contrib.auth import authenticate, get_user_model
+from django.db.models import Prefetch
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from django.contrib.auth import get_user_model
 from rest_framework import viewsets, status, generics, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 
 # Importação de todos os modelos e serializers
-from .models import Restaurant, Dish, Order, OrderItem, Profile, Card
+from .archive import OrderHistory
+from .batch import execute_batch
+from . import fast_json
+from .models import (
+    Restaurant, Dish, DishRecommendation, Order, OrderItem, ArchivedOrder, ArchivedOrderItem, Profile, Card,
+)
+from .geo import get_geocoder, nearby_restaurants
+from .hashing import HashPoolSaturated, aauthenticate_user, ahash_password, get_hash_pool
+from .inventory import OutOfStock, place_order
+from .menus import get_menu_variant
+from .pubsub import get_broker, user_orders_channel
+from .querylog import query_log
 from .serializers import (
-    RestaurantSerializer, DishSerializer, OrderSerializer, OrderItemSerializer,
+    RestaurantSerializer, NearbyRestaurantSerializer, DishSerializer, DishRecommendationSerializer, OrderSerializer, OrderItemSerializer,
     UserSerializer, ProfileSerializer, CardSerializer, ChangePasswordSerializer,
-    UserAndProfileSerializer 
+    UserAndProfileSerializer, ArchivedOrderSerializer, ArchivedOrderItemSerializer,
 )
 
 User = get_user_model()
@@ -40,45 +66,81 @@ class ChangePasswordView(generics.UpdateAPIView):
 # VIEWS DE AUTENTICAÇÃO E VERIFICAÇÃO DE E-MAIL
 # ===================================================================
 
-class RegisterView(APIView):
+def hash_pool_busy_response():
+    return JsonResponse(
+        {'error': 'Servidor ocupado. Tente novamente em instantes.'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': '1'},
+    )
+
+
+def read_request_data(request):
+    """
+    Corpo da requisição (JSON ou formulário) para as views assíncronas, que
+    não passam pelos parsers do DRF. Retorna None se o JSON for inválido.
+    """
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST.dict()
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class RegisterView(View):
     """
     Registra um novo usuário, o deixa inativo e envia um e-mail com 
     um código de verificação para ativar a conta.
+
+    Assíncrona: no servidor ASGI, a thread fica livre enquanto o hash da senha
+    é calculado no pool de hashing.
     """
-    permission_classes = [AllowAny]
 
-    def post(self, request):
-        data = request.data.copy()
+    async def post(self, request):
+        data = read_request_data(request)
+        if data is None:
+            return JsonResponse({'error': 'JSON inválido.'}, status=status.HTTP_400_BAD_REQUEST)
         data['username'] = data.get('email', '')
         data['first_name'] = data.get('name', '')
 
         serializer = UserSerializer(data=data)
-        if serializer.is_valid():
-            user = serializer.save()
-            user.is_active = False
-            user.save()
-
-            profile, created = Profile.objects.get_or_create(user=user)
-
-            code = str(random.randint(100000, 999999))
-            expiry_time = timezone.now() + timedelta(minutes=15)
-            profile.verification_code = code
-            profile.code_expiry = expiry_time
-            profile.save()
-
-            try:
-                subject = 'Seu Código de Verificação Foody'
-                message = f'Olá {user.first_name},\n\nSeu código para ativar sua conta é: {code}\n\nEle expira em 15 minutos.'
-                from_email = settings.EMAIL_HOST_USER
-                recipient_list = [user.email]
-                send_mail(subject, message, from_email, recipient_list)
-            except Exception as e:
-                user.delete()
-                return Response({'error': f'Falha ao enviar e-mail de verificação: {e}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-            return Response({'message': 'Cadastro realizado! Verifique seu e-mail para o código de ativação.'}, status=status.HTTP_201_CREATED)
-        else:
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            encoded_password = await ahash_password(serializer.validated_data['password'])
+        except HashPoolSaturated:
+            return hash_pool_busy_response()
+        user = await sync_to_async(serializer.save)(encoded_password=encoded_password)
+
+        try:
+            await sync_to_async(self.send_verification_code)(user)
+        except Exception as e:
+            await user.adelete()
+            return JsonResponse({'error': f'Falha ao enviar e-mail de verificação: {e}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return JsonResponse({'message': 'Cadastro realizado! Verifique seu e-mail para o código de ativação.'}, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def send_verification_code(user):
+        user.is_active = False
+        user.save()
+
+        profile, created = Profile.objects.get_or_create(user=user)
+
+        code = str(random.randint(100000, 999999))
+        expiry_time = timezone.now() + timedelta(minutes=15)
+        profile.verification_code = code
+        profile.code_expiry = expiry_time
+        profile.save()
+
+        subject = 'Seu Código de Verificação Foody'
+        message = f'Olá {user.first_name},\n\nSeu código para ativar sua conta é: {code}\n\nEle expira em 15 minutos.'
+        from_email = settings.EMAIL_HOST_USER
+        recipient_list = [user.email]
+        send_mail(subject, message, from_email, recipient_list)
 
 
 class VerifyEmailView(APIView):
@@ -112,22 +174,32 @@ class VerifyEmailView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class LoginView(APIView):
-    permission_classes = [AllowAny]
+@method_decorator(csrf_exempt, name='dispatch')
+class LoginView(View):
+    """
+    Login por e-mail e senha. Assíncrona, como o RegisterView: a verificação
+    do hash é aguardada sem ocupar a thread do servidor ASGI.
+    """
 
-    def post(self, request):
-        email = request.data.get('email')
-        password = request.data.get('password')
+    async def post(self, request):
+        data = read_request_data(request)
+        if data is None:
+            return JsonResponse({'error': 'JSON inválido.'}, status=status.HTTP_400_BAD_REQUEST)
+        email = data.get('email')
+        password = data.get('password')
 
-        user = authenticate(username=email, password=password)
+        try:
+            user = await aauthenticate_user(request, email, password)
+        except HashPoolSaturated:
+            return hash_pool_busy_response()
         
         if user is not None and user.is_active:
-            profile, created = Profile.objects.get_or_create(user=user)
+            profile, created = await Profile.objects.aget_or_create(user=user)
             refresh = RefreshToken.for_user(user)
             
             role = 'admin' if user.is_superuser or user.is_staff else profile.role
 
-            return Response({
+            return JsonResponse({
                 'access': str(refresh.access_token),
                 'refresh': str(refresh),
                 'role': role, 
@@ -136,7 +208,68 @@ class LoginView(APIView):
                 'id': user.id
             })
             
-        return Response({'error': 'Credenciais inválidas ou conta não verificada.'}, status=status.HTTP_401_UNAUTHORIZED)
+        return JsonResponse({'error': 'Credenciais inválidas ou conta não verificada.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+
+class HashPoolMetricsView(APIView):
+    """
+    Utilização do pool de hashing de senhas (apenas staff).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        pool = get_hash_pool()
+        if pool is None:
+            return Response({'enabled': False})
+        return Response({'enabled': True, **pool.stats()})
+
+
+class SlowQueryLogView(APIView):
+    """
+    Consultas lentas registradas pelo SlowQueryMiddleware (apenas staff):
+    grupos por formato de consulta e as entradas mais recentes.
+    ?fingerprint= filtra as entradas de um grupo; DELETE limpa o buffer.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        entries = query_log.entries()
+        fingerprint = request.query_params.get('fingerprint')
+        if fingerprint:
+            entries = [entry for entry in entries if entry['fingerprint'] == fingerprint]
+        return Response({
+            'enabled': getattr(settings, 'SLOW_QUERY_LOG_ENABLED', False),
+            'threshold_ms': getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 100),
+            'groups': query_log.groups(),
+            'entries': entries,
+        })
+
+    def delete(self, request):
+        query_log.clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class BatchView(APIView):
+    """
+    Executa várias requisições GET da API numa única chamada, autenticando
+    uma só vez. Corpo: {"requests": [{"method": "GET", "path": "/api/profile/"}, ...]}.
+    Retorna {"responses": [{"status": 200, "body": {...}}, ...]} na mesma ordem.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        specs = request.data.get('requests') if isinstance(request.data, dict) else None
+        if not isinstance(specs, list) or not specs:
+            return Response({'error': 'Informe a lista "requests".'}, status=status.HTTP_400_BAD_REQUEST)
+
+        max_requests = getattr(settings, 'BATCH_MAX_REQUESTS', 10)
+        if len(specs) > max_requests:
+            return Response(
+                {'error': f'No máximo {max_requests} requisições por batch.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response({'responses': execute_batch(request, specs)})
 
 
 # ===================================================================
@@ -147,7 +280,12 @@ class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        serializer = ProfileSerializer(request.user.profile)
+        # Perfil, usuário e estatísticas de pedidos numa única consulta.
+        profile = get_object_or_404(
+            Profile.objects.select_related('user', 'user__order_stats__favorite_restaurant'),
+            user=request.user,
+        )
+        serializer = ProfileSerializer(profile)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def put(self, request):
@@ -189,11 +327,122 @@ class CardDetailView(generics.RetrieveUpdateDestroyAPIView):
 # VIEWSETS PARA RESTAURANTES, PRATOS E PEDIDOS
 # ===================================================================
 
+class IsAdminRole(permissions.BasePermission):
+    """
+    Staff, superusuários ou usuários com perfil 'admin' (mesma regra do LoginView).
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        if user.is_staff or user.is_superuser:
+            return True
+        profile = getattr(user, 'profile', None)
+        return profile is not None and profile.role == 'admin'
+
+
+def wants_json(request):
+    """
+    True quando a resposta negociada é JSON (e não, por exemplo, a API navegável),
+    caso em que as listagens podem usar o caminho rápido de app/fast_json.py.
+    """
+    return request.accepted_renderer.format == 'json'
+
+
 class RestaurantViewSet(viewsets.ModelViewSet):
-    queryset = Restaurant.objects.all()
+    queryset = Restaurant.objects.order_by('id')
     serializer_class = RestaurantSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.prefetch_related(Prefetch('dishes', queryset=Dish.objects.order_by('id')))
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if wants_json(request):
+            return fast_json.json_response(fast_json.restaurant_list(self.filter_queryset(self.get_queryset())))
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=True, methods=['get'])
+    def menu(self, request, pk=None):
+        """
+        Cardápio do restaurante agrupado por categoria, servido pré-renderizado
+        e pré-comprimido (brotli/gzip, conforme o Accept-Encoding), com ETag.
+        """
+        try:
+            restaurant_id = int(pk)
+        except ValueError:
+            return Response({'error': 'Restaurante inválido.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        variant = get_menu_variant(restaurant_id, request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if variant is None:
+            return Response({'error': 'Restaurante não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+        etag, encoding, content = variant
+
+        # Uma ETag por codificação: são representações diferentes do recurso.
+        etag = f'"{etag}-{encoding}"' if encoding else f'"{etag}"'
+        if etag in [tag.strip() for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(content, content_type='application/json')
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Accept-Encoding'])
+        response['Cache-Control'] = 'public, no-cache'
+        return response
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAdminRole])
+    def queue(self, request, pk=None):
+        """
+        Fila da cozinha: pedidos pendentes do restaurante, do mais antigo ao
+        mais novo, com seus itens. Usa o índice (restaurant, status, created_at).
+        """
+        try:
+            restaurant_id = int(pk)
+        except ValueError:
+            return Response({'error': 'Restaurante inválido.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        orders = (
+            Order.objects.filter(restaurant_id=restaurant_id, status='P')
+            .order_by('created_at')
+            .prefetch_related(Prefetch('items', queryset=OrderItem.objects.select_related('dish').order_by('id')))
+        )
+        serializer = OrderSerializer(orders, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='nearby')
+    def nearby(self, request):
+        """
+        Restaurantes que entregam em ?lat=&lng=, do mais próximo ao mais distante.
+        Sem coordenadas, usa o endereço do perfil do usuário logado.
+        """
+        lat = request.query_params.get('lat')
+        lng = request.query_params.get('lng')
+
+        if lat is None and lng is None:
+            coords = None
+            profile = getattr(request.user, 'profile', None) if request.user.is_authenticated else None
+            if profile is not None:
+                coords = get_geocoder().geocode(profile.address)
+            if coords is None:
+                return Response({'error': 'Informe os parâmetros lat e lng.'}, status=status.HTTP_400_BAD_REQUEST)
+            lat, lng = coords
+
+        try:
+            lat, lng = float(lat), float(lng)
+        except (TypeError, ValueError):
+            return Response({'error': 'Coordenadas inválidas.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            return Response({'error': 'Coordenadas inválidas.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        restaurants = nearby_restaurants(self.get_queryset(), lat, lng)
+        serializer = NearbyRestaurantSerializer(restaurants, many=True)
+        return Response(serializer.data)
+
 
 class DishViewSet(viewsets.ModelViewSet):
     serializer_class = DishSerializer
@@ -206,25 +455,303 @@ class DishViewSet(viewsets.ModelViewSet):
         
         return Dish.objects.none()
 
+    def get_recommendations(self, dish_ids):
+        return (
+            DishRecommendation.objects
+            .filter(dish_id__in=dish_ids, recommended__restaurant_id=self.kwargs.get('restaurant_pk'))
+            .select_related('recommended')
+        )
+
+    @action(detail=True, methods=['get'])
+    def recommendations(self, request, restaurant_pk=None, pk=None):
+        """
+        Pratos frequentemente pedidos junto com este, já pré-calculados.
+        """
+        try:
+            dish_id = int(pk)
+        except ValueError:
+            return Response({'error': 'Prato inválido.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        recommendations = self.get_recommendations([dish_id]).order_by('rank')
+        serializer = DishRecommendationSerializer(recommendations, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='recommendations')
+    def basket_recommendations(self, request, restaurant_pk=None):
+        """
+        Recomendações para uma cesta: ?dishes=1,2,3. Soma os scores dos
+        vizinhos de cada prato e remove os que já estão na cesta.
+        """
+        try:
+            dish_ids = {int(value) for value in request.query_params.get('dishes', '').split(',') if value}
+        except ValueError:
+            return Response({'error': 'Lista de pratos inválida.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        combined = {}
+        for recommendation in self.get_recommendations(dish_ids):
+            if recommendation.recommended_id in dish_ids:
+                continue
+            current = combined.get(recommendation.recommended_id)
+            if current is None:
+                combined[recommendation.recommended_id] = recommendation
+            else:
+                current.score += recommendation.score
+
+        top_k = getattr(settings, 'RECOMMENDATIONS_TOP_K', 10)
+        ranked = sorted(combined.values(), key=lambda recommendation: -recommendation.score)[:top_k]
+        serializer = DishRecommendationSerializer(ranked, many=True)
+        return Response(serializer.data)
+
+class OrderHistoryPagination(LimitOffsetPagination):
+    """
+    Paginação opcional do histórico: só pagina quando ?limit= é informado,
+    mantendo a lista completa como resposta padrão.
+
+    Sem `count`: busca uma linha a mais para saber se há próxima página, assim
+    o arquivo só é consultado quando a página passa dos pedidos quentes.
+    """
+    max_limit = 100
+    template = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        return rows[:self.limit]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
 class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OrderHistoryPagination
     queryset = Order.objects.all()
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user).order_by('-created_at')
+        return (
+            self.queryset.filter(user=self.request.user)
+            .prefetch_related(Prefetch('items', queryset=OrderItem.objects.select_related('dish').order_by('id')))
+            .order_by('-created_at')
+        )
+
+    def get_archived_queryset(self):
+        return (
+            ArchivedOrder.objects.filter(user=self.request.user)
+            .prefetch_related(Prefetch('items', queryset=ArchivedOrderItem.objects.select_related('dish').order_by('id')))
+            .order_by('-created_at')
+        )
+
+    def list(self, request, *args, **kwargs):
+        # Pedidos quentes primeiro; o arquivo só é lido quando a página passa deles.
+        history = OrderHistory(self.get_queryset(), self.get_archived_queryset())
+        page = self.paginate_queryset(history)
+        if page is None and wants_json(request):
+            return fast_json.json_response(
+                fast_json.order_list(history.hot, OrderItem)
+                + fast_json.order_list(history.archived, ArchivedOrderItem)
+            )
+        orders = list(history) if page is None else page
+
+        hot = [order for order in orders if isinstance(order, Order)]
+        archived = [order for order in orders if isinstance(order, ArchivedOrder)]
+        data = self.get_serializer(hot, many=True).data + ArchivedOrderSerializer(archived, many=True).data
+
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            archived = get_object_or_404(self.get_archived_queryset(), pk=kwargs['pk'])
+            return Response(ArchivedOrderSerializer(archived).data)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(detail=True, methods=['post'])
+    def reorder(self, request, pk=None):
+        """
+        Cria um novo pedido com os mesmos itens de um pedido anterior, usando
+        os preços atuais dos pratos. Pratos que não existem mais são ignorados
+        e listados em `skipped_dishes` (id antigo e nome salvo no pedido).
+        """
+        try:
+            order_id = int(pk)
+        except ValueError:
+            return Response({'error': 'Pedido não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+
+        order_model, item_model = Order, OrderItem
+        source = order_model.objects.filter(pk=order_id, user=request.user).values('payment_method', 'restaurant_id').first()
+        if source is None:
+            # Pedidos antigos podem ter sido movidos para o arquivo.
+            order_model, item_model = ArchivedOrder, ArchivedOrderItem
+            source = order_model.objects.filter(pk=order_id, user=request.user).values('payment_method', 'restaurant_id').first()
+        if source is None:
+            return Response({'error': 'Pedido não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+
+        lines = item_model.objects.filter(order_id=order_id).order_by('id').values_list(
+            'dish_id', 'dish_name', 'quantity', 'dish__name', 'dish__price', 'dish__stock',
+        )
+        items, skipped = [], []
+        tracked_dish_ids = set()
+        for dish_id, dish_name, quantity, current_name, price, stock in lines:
+            # Prato removido: o item ficou sem prato (ou, no arquivo, aponta
+            # para um id que não existe mais).
+            if price is None:
+                skipped.append({'dish': dish_id, 'dish_name': dish_name})
+                continue
+            items.append(OrderItem(dish_id=dish_id, dish_name=current_name, quantity=quantity, price=price))
+            if stock is not None:
+                tracked_dish_ids.add(dish_id)
+
+        if not items:
+            return Response(
+                {'error': 'Nenhum prato deste pedido está mais disponível.', 'skipped_dishes': skipped},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            order = place_order(
+                items, tracked_dish_ids,
+                user=request.user, restaurant_id=source['restaurant_id'], payment_method=source['payment_method'],
+            )
+        except OutOfStock as exc:
+            # Mesmo formato de erro do checkout (OrderSerializer.create).
+            return Response({'items': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = self.get_serializer(self.get_queryset().get(pk=order.pk)).data
+        data['skipped_dishes'] = skipped
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class OrderStatusStreamView(View):
+    """
+    Stream Server-Sent Events com as mudanças de status dos pedidos do usuário.
+    Substitui o polling em /api/orders/. Requer o servidor ASGI.
+
+    O token JWT pode vir no header Authorization ou em ?token=, já que o
+    EventSource do navegador não permite headers customizados.
+    """
+
+    async def get(self, request):
+        # No WSGI o StreamingHttpResponse consome o gerador assíncrono inteiro
+        # antes de responder; como o stream nunca termina, o worker ficaria
+        # preso para sempre.
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {'error': 'O stream de pedidos requer o servidor ASGI.'}, status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+
+        user = await self.authenticate(request)
+        if user is None:
+            return JsonResponse({'error': 'Credenciais inválidas.'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        # Assina antes de ler o estado atual para não perder eventos no intervalo.
+        subscription = get_broker().subscribe(user_orders_channel(user.id))
+        try:
+            pending = await sync_to_async(list)(
+                Order.objects.filter(user=user, status='P').values('id', 'status')
+            )
+        except Exception:
+            subscription.close()
+            raise
+
+        response = StreamingHttpResponse(self.stream(subscription, pending), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def authenticate(self, request):
+        authenticator = JWTAuthentication()
+        raw_token = request.GET.get('token')
+        try:
+            if raw_token:
+                validated_token = authenticator.get_validated_token(raw_token)
+                return await sync_to_async(authenticator.get_user)(validated_token)
+            result = await sync_to_async(authenticator.authenticate)(request)
+        except (InvalidToken, TokenError, AuthenticationFailed):
+            return None
+        return result[0] if result else None
+
+    async def stream(self, subscription, pending):
+        heartbeat = getattr(settings, 'ORDER_STREAM_HEARTBEAT', 15)
+        try:
+            yield 'retry: 3000\n\n'
+            yield self.format_event('snapshot', pending)
+            while True:
+                message = await subscription.get(timeout=heartbeat)
+                if message is None:
+                    yield ': keep-alive\n\n'
+                else:
+                    yield self.format_event('status', message)
+        finally:
+            subscription.close()
+
+    @staticmethod
+    def format_event(event, data):
+        return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
 
 class OrderItemViewSet(viewsets.ModelViewSet):
+    """
+    Itens de um pedido (/api/orders/{order_pk}/items/). Se o pedido já foi
+    arquivado, a leitura cai para os itens do arquivo, como em OrderViewSet.
+    """
     serializer_class = OrderItemSerializer
     permission_classes = [IsAuthenticated]
     queryset = OrderItem.objects.all()
 
+    def get_order_id(self):
+        try:
+            return int(self.kwargs['order_pk'])
+        except (KeyError, ValueError):
+            raise Http404
+
     def get_queryset(self):
-        return self.queryset.filter(order__user=self.request.user)
+        return (
+            self.queryset.filter(order_id=self.get_order_id(), order__user=self.request.user)
+            .select_related('dish').order_by('id')
+        )
+
+    def get_archived_queryset(self):
+        return (
+            ArchivedOrderItem.objects.filter(order_id=self.get_order_id(), order__user=self.request.user)
+            .select_related('dish').order_by('id')
+        )
+
+    def list(self, request, *args, **kwargs):
+        items = list(self.get_queryset())
+        if not items:
+            archived = list(self.get_archived_queryset())
+            if archived:
+                return Response(ArchivedOrderItemSerializer(archived, many=True).data)
+        return Response(self.get_serializer(items, many=True).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            archived = get_object_or_404(self.get_archived_queryset(), pk=kwargs['pk'])
+            return Response(ArchivedOrderItemSerializer(archived).data)
 
 class ChangePasswordView(generics.UpdateAPIView):
     serializer_class = ChangePasswordSerializer
@@ -260,9 +787,14 @@ class UserViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         if self.request.user.is_superuser:
-            return self.queryset
+            return self.queryset.select_related('profile')
         return self.queryset.none()
 
+    def list(self, request, *args, **kwargs):
+        if wants_json(request):
+            return fast_json.json_response(fast_json.user_list(self.filter_queryset(self.get_queryset())))
+        return super().list(request, *args, **kwargs)
+
     @action(detail=True, methods=['post'], url_path='toggle-active')
     def toggle_active(self, request, pk=None):
         user_to_toggle = self.get_object()
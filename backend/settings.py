@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'app.profiling.ProfilingMiddleware', # 👈 Primeiro, para medir os outros; só fica ativo com PROFILING_ENABLED=True
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware', # 👈 Adicionado WhiteNoise
@@ -50,6 +51,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'app.querylog.SlowQueryMiddleware', # 👈 Só fica ativo com SLOW_QUERY_LOG=True
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -101,6 +103,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
+        'app.batch.BatchSubRequestAuthentication', # Sub-requisições do /api/batch/, já autenticadas
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     )
 }
@@ -140,4 +143,110 @@ EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER') # Carrega de variável de ambiente
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD') # Carrega de variável de ambiente
-# --- FIM DA MODIFICAÇÃO DE E-MAIL ---
\ No newline at end of file
+# --- FIM DA MODIFICAÇÃO DE E-MAIL ---
+
+
+# --- CONFIGURAÇÃO DO CACHE ---
+# Em produção, REDIS_URL aponta para um Redis compartilhado entre os workers
+# (contadores de carga do app/eta.py). Sem ela, cai no LocMemCache, que é por
+# processo e serve só para desenvolvimento.
+if 'REDIS_URL' in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+# --- FIM DA CONFIGURAÇÃO DO CACHE ---
+
+
+# --- CONFIGURAÇÃO DO STREAM DE PEDIDOS (SSE) ---
+# Broker de pub/sub usado para empurrar mudanças de status dos pedidos.
+# O InMemoryBroker só entrega dentro do mesmo processo: em produção com vários
+# workers, troque por um backend compartilhado com a mesma interface.
+PUBSUB_BACKEND = os.environ.get('PUBSUB_BACKEND', 'app.pubsub.InMemoryBroker')
+PUBSUB_OPTIONS = {'queue_size': 100}
+ORDER_STREAM_HEARTBEAT = 15 # Segundos entre comentários keep-alive
+# --- FIM DA CONFIGURAÇÃO DO STREAM DE PEDIDOS ---
+
+
+# --- CONFIGURAÇÃO DE GEOLOCALIZAÇÃO ---
+# Geocodificador plugável. O LocalGeocoder resolve endereços apenas a partir
+# da tabela abaixo, sem chamar nenhum serviço externo.
+GEOCODER_BACKEND = 'app.geo.LocalGeocoder'
+GEOCODER_LOCAL_TABLE = {}
+GEO_MAX_DELIVERY_RADIUS_KM = 15 # Raio máximo considerado na busca por proximidade
+DELIVERY_AVERAGE_SPEED_KMH = 20 # Velocidade média do entregador, para a estimativa
+# --- FIM DA CONFIGURAÇÃO DE GEOLOCALIZAÇÃO ---
+
+
+# --- ESTIMATIVA DINÂMICA DE ENTREGA ---
+# Contadores de carga por restaurante no cache (pedidos concluídos por
+# intervalo e fila de pendentes). Precisa do cache compartilhado (REDIS_URL).
+# A fila é recontada no banco pelo comando refresh_restaurant_loads (agende-o
+# periodicamente e no deploy).
+RESTAURANT_LOAD_BUCKET_SECONDS = 300 # Tamanho de cada intervalo da janela
+RESTAURANT_LOAD_WINDOW_BUCKETS = 6 # Janela deslizante de 30 minutos
+RESTAURANT_MIN_THROUGHPUT_PER_HOUR = 12 # Ritmo mínimo assumido para escoar a fila
+RESTAURANT_ETA_MAX_FACTOR = 3 # A ETA nunca passa de 3x o delivery_time cadastrado
+# --- FIM DA ESTIMATIVA DINÂMICA DE ENTREGA ---
+
+
+# Cardápios pré-renderizados (/api/restaurants/{id}/menu/): reconstruídos numa
+# thread em segundo plano depois do commit. False reconstrói na própria requisição.
+MENU_REBUILD_ASYNC = True
+
+
+# Tabela de faixas de BIN (CSV: start,end,brand,card_type) usada para detectar
+# a bandeira dos cartões.
+CARD_BIN_TABLE = os.environ.get('CARD_BIN_TABLE', os.path.join(BASE_DIR, 'app', 'data', 'bin_ranges.csv'))
+
+# Quantidade de pratos recomendados guardados por prato (ver refresh_recommendations).
+RECOMMENDATIONS_TOP_K = 10
+# Pedidos mais novos que isso ficam para a próxima execução, para não pular
+# pedidos cuja transação ainda não fez commit.
+RECOMMENDATIONS_SETTLE_SECONDS = 300
+
+# Arquivamento de pedidos completos (ver o comando archive_orders).
+ORDER_ARCHIVE_AFTER_DAYS = int(os.environ.get('ORDER_ARCHIVE_AFTER_DAYS', '180'))
+ORDER_ARCHIVE_BATCH_SIZE = 1000
+
+# Endpoint /api/batch/: máximo de sub-requisições por chamada e quantas rodam em paralelo.
+BATCH_MAX_REQUESTS = 10
+BATCH_MAX_WORKERS = 4
+
+# Pool de processos para o hashing de senhas no login e no cadastro.
+# 0 desativa o pool e o hashing volta a rodar no próprio worker.
+# Os limites valem por processo do servidor (cada worker do gunicorn tem o seu
+# pool): por padrão, os núcleos são divididos entre os WEB_CONCURRENCY workers.
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY)))
+PASSWORD_HASH_QUEUE_LIMIT = 32 # Por processo: tarefas aguardando além das em execução; acima disso, 503
+PASSWORD_HASH_TIMEOUT = 10 # Segundos
+
+
+# --- LOG DE CONSULTAS LENTAS ---
+# Opt-in: registra consultas acima do limite com a view de origem e o EXPLAIN,
+# num buffer circular consultável em /api/debug/slow-queries/ (staff).
+SLOW_QUERY_LOG_ENABLED = os.environ.get('SLOW_QUERY_LOG', 'False') == 'True'
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', '100'))
+SLOW_QUERY_LOG_SIZE = 500
+# Fração das consultas lentas que roda EXPLAIN ANALYZE (executa a consulta de novo; só PostgreSQL).
+SLOW_QUERY_EXPLAIN_ANALYZE_RATE = float(os.environ.get('SLOW_QUERY_EXPLAIN_ANALYZE_RATE', '0'))
+# --- FIM DO LOG DE CONSULTAS LENTAS ---
+
+
+# --- PERFIL SOB DEMANDA ---
+# Staff envia `X-Profile: folded|pstats` (ou ?profile=) e recebe o perfil de CPU
+# da requisição como download. Desligado, o middleware sai da pilha.
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILING_SAMPLE_INTERVAL_MS', '1'))
+# Limites para o ?profile_interval= enviado na requisição.
+PROFILING_SAMPLE_INTERVAL_RANGE_MS = (0.5, 50.0)
+# --- FIM DO PERFIL SOB DEMANDA ---
\ No newline at end of file